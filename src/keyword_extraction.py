@@ -1,25 +1,92 @@
+import hashlib
 import re
 import warnings
+from collections import OrderedDict
 from typing import List, Optional, Tuple
 
 import networkx as nx
 import numpy as np
+import pandas as pd
 from matplotlib import pyplot as plt
 from matplotlib.figure import Figure
 from pandas import DataFrame
 from pandas.core.common import SettingWithCopyWarning
-from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+from scipy.sparse import csr_matrix, diags
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from utils.group_index import GroupIndex
+from utils.reader import Reader
+from utils.token_ids import TokenIds
+from utils.vocabulary import Vocabulary
 
 warnings.simplefilter(action="ignore", category=SettingWithCopyWarning)
 
+# Terms, term counts without blacklist words, TF-IDF weights, noun counts and noun vocabulary of a fitted model
+KeywordModel = Tuple[np.ndarray, csr_matrix, csr_matrix, csr_matrix, Vocabulary]
+
 
 class KeywordExtraction:
     """
     Class to get most important keywords/ topics in newspapers for different parties
     """
 
-    def __init__(self, df_paragraphs: DataFrame):
+    blacklist_words = [
+        "minister",
+        "kanzler",
+        "bürgermeister",
+        "montag",
+        "dienstag",
+        "mittwoch",
+        "donnerstag",
+        "freitag",
+        "samstag",
+        "sonntag",
+        "cdu",
+        "csu",
+        "spd",
+        "grüne",
+        "linke",
+        "afd",
+        "fdp",
+        "partei",
+        "sprecher",
+        "bundesregierung",
+        "union",
+        "jahr",
+        "live-ticker",
+        "info",
+        "ob",
+        "liberale",
+        "tag",
+        "uhr",
+        "spalte",
+        "artikel",
+    ]
+
+    # Compiled once, every word of the vocabulary is searched for any blacklist word
+    blacklist = re.compile("|".join([re.escape(word) for word in blacklist_words]))
+
+    def __init__(
+        self,
+        df_paragraphs: DataFrame,
+        cache_size: int = 4,
+        group_index: Optional[GroupIndex] = None,
+        column_path: Optional[str] = None,
+    ):
+        """
+        :param df_paragraphs: the dataframe to analyze.
+        :param cache_size: How many fitted models are kept, the least recently used model is removed first.
+        :param group_index: Index of the parties and media of all paragraphs. If None, it is built when needed.
+        :param column_path: The directory of the stored columns the paragraphs were read from. If the nouns are not
+        loaded, their token ids are read from it.
+        """
         self.df_paragraphs = df_paragraphs
+        self.group_index = group_index
+        self.column_path = column_path
+        self.cache_size = cache_size
+        self.model_cache: OrderedDict = OrderedDict()
+        self.nouns: Optional[Tuple[pd.Index, np.ndarray, np.ndarray, str, TokenIds]] = None
+        self.blacklist_mask: Tuple[Optional[Vocabulary], np.ndarray] = (None, np.zeros(0, dtype=bool))
 
     def set_data(self, df_paragraphs: DataFrame) -> None:
         """
@@ -54,18 +121,7 @@ class KeywordExtraction:
 
         :return: A data frame with the most important term-weight-tuples for the respective parties or media.
         """
-        # Get nouns from dataframe
-        nouns = self.df_paragraphs["nouns"].apply(lambda row: " ".join(row))
-
-        # Vectorize nouns
-        vectorizer = CountVectorizer(min_df=5, token_pattern=r"(?u)\b[a-zA-Z0-9_\-][a-zA-Z0-9_\-]+\b")
-        count_vectorized = vectorizer.fit_transform(nouns)
-
-        # Apply tf-idf to count_vectorized
-        transformer = TfidfTransformer(smooth_idf=True, use_idf=True)
-
-        # Generate tf-idf for the given document
-        transformer.fit(count_vectorized)
+        model = self._get_model()
 
         if parties is None:
             parties = ["CDU", "CSU", "SPD", "FDP", "AfD", "Grüne", "Linke"]
@@ -73,25 +129,21 @@ class KeywordExtraction:
         if media is None:
             media = ["Bild", "Tagesschau", "TAZ"]
 
-        terms: List[str] = []
-
-        # Get top words by TF-IDF weight
-        if by_party or all_terms:
-            for party in parties:
-                terms += self._get_top_words(True, party, vectorizer, transformer, topn)
-
-        if not by_party or all_terms:
-            for m in media:
-                terms += self._get_top_words(False, m, vectorizer, transformer, topn)
+        # Get top words by TF-IDF weight of all parties and media at once
+        top_words = self._get_top_words(
+            parties if by_party or all_terms else [], media if not by_party or all_terms else [], model, topn
+        )
 
-        terms = list(set(terms))
+        terms = list({term for group_terms in top_words for term in group_terms})
         tuples: List[Tuple[str, str, int]] = []
 
         # Count appearance of term for party or media to determine weight for bipartite graph
-        for party_or_media in parties if by_party else media:
-            for term in terms:
-                term_count = self.get_term_count(self.df_paragraphs, by_party, party_or_media, term)
-                tuples.append((party_or_media, term, term_count))
+        parties_or_media = parties if by_party else media
+        term_counts = self._get_term_counts(self.df_paragraphs, model[3], model[4], by_party, parties_or_media, terms)
+
+        for party_or_media, group_counts in zip(parties_or_media, term_counts):
+            for term, term_count in zip(terms, group_counts):
+                tuples.append((party_or_media, term, int(term_count)))
 
         return DataFrame(tuples, columns=["party" if by_party else "media", "term", "weight"])
 
@@ -101,72 +153,218 @@ class KeywordExtraction:
         :param parties: parties that are selected in the gui
         :return: dataframe containing tuples with parties and top words
         """
-        # Get nouns from dataframe
-        nouns = self.df_paragraphs["nouns"].apply(lambda row: " ".join(row))
-
-        # Vectorize character_words
-        vectorizer = CountVectorizer(min_df=5, token_pattern=r"(?u)\b[a-zA-Z0-9_\-][a-zA-Z0-9_\-]+\b")
-        count_vectorized = vectorizer.fit_transform(nouns)
-
-        # Apply tf-idf to count_vectorized
-        transformer = TfidfTransformer(smooth_idf=True, use_idf=True)
-
-        # Generate tf-idf for the given document
-        transformer.fit(count_vectorized)
+        model = self._get_model()
 
         if parties is None:
             parties = ["CDU", "CSU", "SPD", "FDP", "AfD", "Grüne", "Linke"]
 
         tuples = []
 
-        for party in parties:
-            terms = self._get_top_words(True, party, vectorizer, transformer)
+        for party, terms in zip(parties, self._get_top_words(parties, [], model)):
             terms = list(set(terms))
             for term in terms:
                 tuples.append((party, term))
 
         return DataFrame(tuples, columns=["party", "term"])
 
+    def _get_model(self) -> KeywordModel:
+        """
+        Get the fitted TF-IDF model of the current dataframe. Models are cached by a fingerprint of the dataframe, so
+        the same paragraphs (e.g. when switching between topic views) are only fitted once.
+
+        :return: Tuple of the sorted terms, the counts of the terms in each paragraph, the TF-IDF weights, the counts of
+        the nouns in each paragraph and the vocabulary of the nouns.
+        """
+        fingerprint, nouns = self._get_fingerprint(self.df_paragraphs)
+
+        if fingerprint in self.model_cache:
+            self.model_cache.move_to_end(fingerprint)
+        else:
+            self.model_cache[fingerprint] = self._fit_model(nouns)
+
+            if len(self.model_cache) > self.cache_size:
+                self.model_cache.popitem(last=False)
+
+        return self.model_cache[fingerprint]
+
+    def _get_fingerprint(self, dataframe: DataFrame) -> Tuple[Tuple, Optional[TokenIds]]:
+        """
+        Get a fingerprint of the paragraphs of a dataframe. Stored token ids are identified by their directory and the
+        row ids. Loaded nouns are hashed once (see _get_noun_rows), dataframes with rows of the hashed nouns (e.g.
+        filtered by date or media) are identified by this hash and their rows.
+
+        :param dataframe: The dataframe to identify.
+        :return: Tuple of the fingerprint and the token ids of the loaded nouns (None for stored token ids).
+        """
+        if "nouns" not in dataframe and self.column_path is not None:
+            row_ids = dataframe[Reader.row_id_column].to_numpy(dtype=np.int64)
+            return (self.column_path, len(dataframe), hashlib.sha1(row_ids.tobytes()).hexdigest()), None
+
+        index_hash = hashlib.sha1(pd.util.hash_pandas_object(dataframe.index, index=False).to_numpy().tobytes())
+
+        rows = self._get_noun_rows(dataframe)
+        nouns_hash, tokens = self.nouns[3], self.nouns[4]
+
+        if not np.array_equal(rows, np.arange(len(tokens))):
+            tokens = tokens.select(rows)
+
+        return (None, nouns_hash, len(dataframe), index_hash.hexdigest()), tokens
+
+    def _get_noun_rows(self, dataframe: DataFrame) -> np.ndarray:
+        """
+        Get the rows of the nouns of a dataframe in the hashed nouns. The nouns are hashed (and mapped to token ids)
+        once, a dataframe is matched with them by its index and the identity of its noun lists. Dataframes with other
+        noun lists are hashed again, noun lists must not be changed in place.
+
+        :param dataframe: The dataframe with loaded nouns.
+        :return: Array of the position of each row of the dataframe in the hashed nouns.
+        """
+        nouns = dataframe["nouns"].to_numpy()
+        list_ids = np.fromiter(map(id, nouns), dtype=np.uint64, count=len(nouns))
+
+        if self.nouns is not None and self.nouns[0].is_unique:
+            index, _, hashed_list_ids = self.nouns[:3]
+            rows = index.get_indexer(dataframe.index)
+
+            if (rows >= 0).all() and np.array_equal(hashed_list_ids[rows], list_ids):
+                return rows
+
+        # Hash the content of the nouns, the noun lists are kept so their ids can not be reused by other lists
+        tokens = TokenIds.from_dataframe(dataframe, "nouns")
+        nouns_hash = hashlib.sha1(tokens.ids.tobytes())
+        nouns_hash.update(tokens.offsets.tobytes())
+        nouns_hash.update("\x1f".join(map(str, tokens.vocabulary.terms)).encode("utf-8"))
+
+        self.nouns = (dataframe.index, nouns, list_ids, nouns_hash.hexdigest(), tokens)
+        return np.arange(len(dataframe))
+
+    def _fit_model(self, nouns: Optional[TokenIds] = None) -> KeywordModel:
+        """
+        Fits the TF-IDF model on the nouns of all paragraphs. The nouns are counted from their token ids, every entry of
+        the vocabulary is split into terms once (like CountVectorizer with a token pattern) and only terms contained in
+        at least 5 paragraphs are kept.
+
+        :param nouns: The token ids of the nouns of all paragraphs. If None, they are read from the dataframe.
+        :return: Tuple of the sorted terms, the counts of the terms in each paragraph, the TF-IDF weights, the counts of
+        the nouns in each paragraph and the vocabulary of the nouns.
+        """
+        if nouns is None:
+            nouns = TokenIds.from_dataframe(self.df_paragraphs, "nouns", self.column_path)
+
+        # Split every entry of the vocabulary into lowercase terms
+        token_pattern = re.compile(r"(?u)\b[a-zA-Z0-9_\-][a-zA-Z0-9_\-]+\b")
+        vocabulary_terms = [token_pattern.findall(str(noun).lower()) for noun in nouns.vocabulary.terms]
+        terms = sorted({term for noun_terms in vocabulary_terms for term in noun_terms})
+        term_ids = {term: index for index, term in enumerate(terms)}
+
+        noun_terms = csr_matrix(
+            (
+                np.ones(sum(len(noun_terms) for noun_terms in vocabulary_terms)),
+                (
+                    np.repeat(np.arange(len(vocabulary_terms)), [len(noun_terms) for noun_terms in vocabulary_terms]),
+                    [term_ids[term] for noun_terms in vocabulary_terms for term in noun_terms],
+                ),
+            ),
+            shape=(len(vocabulary_terms), len(terms)),
+        )
+
+        # Remove blacklist words by dropping their rows from the mapping of nouns to terms
+        blacklist_mask = self._get_blacklist_mask(nouns.vocabulary)
+        noun_counts = nouns.count_matrix()
+        count_vectorized = noun_counts @ noun_terms
+        count_vectorized_filtered = noun_counts @ (diags((~blacklist_mask).astype(np.float64)) @ noun_terms)
+
+        # Keep terms contained in at least 5 paragraphs
+        document_frequency = np.asarray((count_vectorized > 0).sum(axis=0)).ravel()
+        frequent_terms = np.flatnonzero(document_frequency >= 5)
+
+        # Apply tf-idf to count_vectorized
+        transformer = TfidfTransformer(smooth_idf=True, use_idf=True)
+
+        # Generate tf-idf for the given document
+        transformer.fit(count_vectorized[:, frequent_terms])
+
+        # Transform all paragraphs once, every row is transformed independently of the others
+        terms = np.array(terms, dtype=object)[frequent_terms]
+        count_vectorized_filtered = count_vectorized_filtered[:, frequent_terms].tocsr()
+        tf_idf = transformer.transform(count_vectorized_filtered).tocsr()
+        return terms, count_vectorized_filtered, tf_idf, noun_counts, nouns.vocabulary
+
     def _get_top_words(
         self,
-        by_party: bool,
-        party_or_media: str,
-        vectorizer: CountVectorizer,
-        transformer: TfidfTransformer,
+        parties: List[str],
+        media: List[str],
+        model: KeywordModel,
         topn: int = 3,
-    ) -> List[str]:
+    ) -> List[List[str]]:
         """
-        Get the most important words for a party by TF-IDF score.
+        Get the most important words for parties and media by TF-IDF score. The mean weights of all groups are
+        calculated with one product of a sparse group indicator matrix and the TF-IDF weights.
 
-        :param by_party: If True, group data by party, otherwise group by media.
-        :param party_or_media: Party or media to get keywords from.
-        :param vectorizer: The TF-IDF Count vectorizer to use for calculating TF-IDF scores.
-        :param transformer: The TF-IDF transformer to use for calculating TF-IDF scores.
+        :param parties: Parties to get keywords from.
+        :param media: Media to get keywords from.
+        :param model: The model of _fit_model.
+        :param topn: How many top words should be chosen for each group.
 
-        :return: The top 3 terms for the party as list.
+        :return: The top terms of each party followed by the top terms of each medium (empty for groups without
+        paragraphs).
         """
-        if by_party:
-            paragraphs = self._get_party_paragraphs(self.df_paragraphs, party_or_media)
+        terms, _, tf_idf, _, _ = model
+        groups = self._get_group_matrix(self.df_paragraphs, parties, media)
+
+        # Average the weights of the paragraphs of each group
+        group_sizes = np.asarray(groups.sum(axis=1)).ravel()
+        weights = (groups @ tf_idf).toarray() / np.maximum(group_sizes, 1)[:, np.newaxis]
+
+        top_words = []
+
+        for party_or_media, group_size, group_weights in zip(parties + media, group_sizes, weights):
+            if group_size == 0:
+                top_words.append([])
+                continue
+
+            top_terms = terms[self._get_top_indices(group_weights, topn)].tolist()
+            print("Top {} words of {}: {}".format(topn, party_or_media, top_terms))
+            top_words.append(top_terms)
+
+        return top_words
+
+    @staticmethod
+    def _get_top_indices(weights: np.ndarray, topn: int) -> np.ndarray:
+        """
+        Get the indices of the largest weights in descending order. Only the candidates found by a partition are
+        sorted; equal weights are ordered by their index.
+
+        :param weights: The weights to select from.
+        :param topn: How many indices to return.
+        :return: Array of the indices of the topn largest weights.
+        """
+        if topn <= 0:
+            return np.zeros(0, dtype=np.int64)
+
+        if topn < len(weights):
+            # Keep all weights that are at least as large as the n-th largest weight
+            threshold = -np.partition(-weights, topn - 1)[topn - 1]
+            candidates = np.flatnonzero(weights >= threshold)
         else:
-            paragraphs = self._get_media_paragraphs(self.df_paragraphs, party_or_media)
+            candidates = np.arange(len(weights))
 
-        # Remove blacklist words from paragraphs
-        paragraphs["nouns"] = self._remove_blacklist_words(paragraphs)
-        # Join nouns to single string
-        nouns = paragraphs["nouns"].apply(lambda row: " ".join(row))
+        return candidates[np.argsort(-weights[candidates], kind="stable")[:topn]]
 
-        # Transform nouns
-        tf_idf_vector = transformer.transform(vectorizer.transform(nouns))
-        weights = np.asarray(tf_idf_vector.mean(axis=0)).ravel().tolist()
+    def _get_group_matrix(self, dataframe: DataFrame, parties: List[str], media: List[str]) -> csr_matrix:
+        """
+        Builds a sparse indicator matrix of the paragraphs of each party and each medium from the group index. Only
+        paragraphs about exactly one party belong to a party.
 
-        # Create dataframe with weights and sort in descending order
-        df_weights = DataFrame({"term": vectorizer.get_feature_names(), "TF_IDF": weights})
-        df_weights = df_weights.sort_values("TF_IDF", ascending=False).reset_index(drop=False)
+        :param dataframe: The dataframe containing the paragraphs.
+        :param parties: The parties of the first rows.
+        :param media: The media of the following rows.
+        :return: Sparse matrix with a row for each party and medium and a column for each paragraph.
+        """
+        masks = GroupIndex.of(dataframe, self.group_index).group_masks(parties, media, only=True)
+        group_rows, paragraph_rows = np.nonzero(masks)
 
-        # Transform dataframe to list and return top n elements
-        top_terms = df_weights["term"].tolist()[:topn]
-        print("Top {} words of {}: {}".format(topn, party_or_media, top_terms))
-        return top_terms
+        return csr_matrix((np.ones(len(group_rows)), (group_rows, paragraph_rows)), shape=(len(masks), len(dataframe)))
 
     def get_term_count(self, dataframe: DataFrame, by_party: bool, party_or_media: str, term: str) -> int:
         """
@@ -179,12 +377,45 @@ class KeywordExtraction:
 
         :return: Number of appearances of the specified term as integer.
         """
+        nouns = TokenIds.from_dataframe(dataframe, "nouns", self.column_path)
+        term_counts = self._get_term_counts(
+            dataframe, nouns.count_matrix(), nouns.vocabulary, by_party, [party_or_media], [term]
+        )
+        return int(term_counts[0, 0])
+
+    def _get_term_counts(
+        self,
+        dataframe: DataFrame,
+        noun_counts: csr_matrix,
+        vocabulary: Vocabulary,
+        by_party: bool,
+        parties_or_media: List[str],
+        terms: List[str],
+    ) -> np.ndarray:
+        """
+        Counts the appearance of terms for parties or media as column sums of the noun counts of their paragraphs.
+
+        :param dataframe: The dataframe containing the paragraphs.
+        :param noun_counts: The counts of the nouns in each paragraph of the dataframe.
+        :param vocabulary: The vocabulary of the nouns.
+        :param by_party: If True, group data by party, otherwise group by media.
+        :param parties_or_media: The parties or media where the terms should be counted.
+        :param terms: The terms which should be counted.
+
+        :return: Array containing the count of each term (columns) for each party or medium (rows).
+        """
         if by_party:
-            paragraphs = self._get_party_paragraphs(dataframe, party_or_media)
+            groups = self._get_group_matrix(dataframe, parties_or_media, [])
         else:
-            paragraphs = self._get_media_paragraphs(dataframe, party_or_media)
+            groups = self._get_group_matrix(dataframe, [], parties_or_media)
+
+        # Only sum the columns of the terms, terms that are no noun are never counted
+        term_ids = np.array([vocabulary.ids.get(term, -1) for term in terms], dtype=np.int64)
+        known_terms = term_ids >= 0
 
-        return paragraphs["nouns"].apply(lambda row: row.count(term)).sum()
+        term_counts = np.zeros((len(parties_or_media), len(terms)), dtype=np.int64)
+        term_counts[:, known_terms] = (groups @ noun_counts[:, term_ids[known_terms]]).toarray()
+        return term_counts
 
     def get_bipartite_graph(self, df_term_weights: DataFrame) -> Figure:
         """
@@ -265,77 +496,32 @@ class KeywordExtraction:
 
         return fig
 
-    def _get_party_paragraphs(self, dataframe: DataFrame, party: str) -> DataFrame:
+    def _get_blacklist_mask(self, vocabulary: Vocabulary) -> np.ndarray:
         """
-        Filter paragraphs to only contain rows with a certain party.
+        Get the blacklist words of a vocabulary. The mask is kept for the last vocabulary, so models fitted on rows of
+        the same stored data only check terms that were added since.
 
-        :param dataframe: The dataframe to filter.
-        :param party: The party to keep in dataframe.
-
-        :return: The filtered dataframe containing only rows about the specified party.
+        :param vocabulary: The vocabulary of the nouns.
+        :return: Array that is True for each blacklisted term of the vocabulary.
         """
-        return dataframe[dataframe.apply(lambda row: len(row["parties"]) == 1 and party in row["parties"], axis=1)]
+        masked_vocabulary, mask = self.blacklist_mask
 
-    def _get_media_paragraphs(self, dataframe: DataFrame, media: str) -> DataFrame:
-        """
-        Filter paragraphs to only contain rows with a certain party.
+        if masked_vocabulary is not vocabulary:
+            mask = np.zeros(0, dtype=bool)
 
-        :param dataframe: The dataframe to filter.
-        :param media: The media to keep in dataframe.
+        if len(mask) < len(vocabulary):
+            new_terms = vocabulary.terms[len(mask) :]
+            mask = np.concatenate([mask, np.fromiter(map(self._is_blacklisted, new_terms), bool, len(new_terms))])
+            self.blacklist_mask = (vocabulary, mask)
 
-        :return: The filtered dataframe containing only rows about the specified party.
-        """
-        return dataframe[dataframe.apply(lambda row: media == row["media"], axis=1)]
+        return mask
 
-    def _remove_blacklist_words(self, dataframe: DataFrame) -> DataFrame:
+    def _is_blacklisted(self, word: str) -> bool:
         """
-        Remove words which are not meaningful as keywords / topics e.g. ministry positions that are held by a certain
-        party, weekdays etc.
+        Checks if a word is not meaningful as keyword / topic e.g. ministry positions that are held by a certain party,
+        weekdays etc.
 
-        :param dataframe: The dataframe to filter the nouns.
-        :return: The filtered data frame without blacklisted words.
+        :param word: Word to check.
+        :return: True if the word contains a blacklist word.
         """
-        return dataframe["nouns"].apply(self._filter_words)
-
-    def _filter_words(self, words: List[str]) -> List[str]:
-        """
-        Filter words (remove words contained in blacklist.
-
-        :param words: Words to filter
-        :return: Filtered word list.
-        """
-        blacklist_words = [
-            "minister",
-            "kanzler",
-            "bürgermeister",
-            "montag",
-            "dienstag",
-            "mittwoch",
-            "donnerstag",
-            "freitag",
-            "samstag",
-            "sonntag",
-            "cdu",
-            "csu",
-            "spd",
-            "grüne",
-            "linke",
-            "afd",
-            "fdp",
-            "partei",
-            "sprecher",
-            "bundesregierung",
-            "union",
-            "jahr",
-            "live-ticker",
-            "info",
-            "ob",
-            "liberale",
-            "tag",
-            "uhr",
-            "spalte",
-            "artikel",
-        ]
-
-        blacklist = re.compile("|".join([re.escape(word) for word in blacklist_words]))
-        return [word for word in words if not blacklist.search(word)]
+        return self.blacklist.search(word) is not None
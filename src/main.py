@@ -4,6 +4,7 @@ from pathlib import Path
 from preprocessing import Preprocessing
 from sentiment_gui import SentimentGUI
 from tfidf_sentiment import TfidfSentiment
+from utils.aggregate_store import AggregateStore
 from utils.arguments import parse_arguments
 from utils.comparison import Comparison
 from utils.labeling import Labeling
@@ -14,21 +15,33 @@ if __name__ == "__main__":
     args = parse_arguments()
 
     # Read articles from json
-    df_articles = Reader.read_articles(args.number_of_articles)
+    df_articles = Reader.read_articles(args.number_of_articles, args.stratified)
 
     # Apply preprocessing
-    preprocessing = Preprocessing()
-    df_paragraphs = preprocessing.get_paragraphs(df_articles, overwrite=args.force_processing)
+    preprocessing = Preprocessing(batch_size=args.batch_size, n_process=args.processes)
+
+    # Evaluate the party pre-filter against the NER based filter
+    if args.prefilter_recall is not None:
+        preprocessing.evaluate_party_prefilter(df_articles, args.prefilter_recall)
+
+    # Columns used row by row are read directly, the others are loaded by the row ids of the paragraphs when needed
+    df_paragraphs = preprocessing.get_paragraphs(
+        df_articles, overwrite=args.force_processing, columns=["media", "date", "parties", "polarity"]
+    )
+    paragraphs_path = Preprocessing.get_columns_path("paragraphs")
+
+    # Calculate sentiment of paragraphs, the tokens are read as token ids
+    tfidf_sentiment = TfidfSentiment(df_paragraphs, paragraphs_path)
+
+    if "sentiment_score_context" not in df_paragraphs or df_paragraphs["sentiment_score_context"].isna().any():
+        tfidf_sentiment.get_context_polarity(8)
 
-    # Calculate sentiment of paragraphs
-    tfidf_sentiment = TfidfSentiment(df_paragraphs)
-    tfidf_sentiment.get_context_polarity(8)
     tfidf_sentiment.calculate_sentiment_score()
     tfidf_sentiment.map_sentiment()
 
     # Label data
     if args.labeling is not None:
-        labeling = Labeling(df_paragraphs)
+        labeling = Labeling(Reader.load_columns(df_paragraphs, paragraphs_path))
         start = args.labeling.split("-")[0]
         start = int(start) if start.isdigit() else 0
         end = args.labeling.split("-")[1]
@@ -50,19 +63,28 @@ if __name__ == "__main__":
         print("Optimal threshold: {}\n".format(optimal_threshold))
 
         # Train the window and the score threshold
-        optimal_context_thresholds = comparison.train_context_thresholds()
+        window_start, window_end = args.windows
+        optimal_context_thresholds = comparison.train_context_thresholds(
+            windows=range(window_start, window_end + 1, args.window_step),
+            max_score_threshold=args.max_score_threshold,
+            score_step=args.score_step,
+            processes=args.processes,
+        )
         print(
             "Optimal context thresholds: {} (window), {} (score)\n".format(
                 optimal_context_thresholds[0], optimal_context_thresholds[1]
             )
         )
 
-    # Save paragraphs to disk
-    Writer.write_dataframe(df_paragraphs, "paragraphs")
+    # Save the analyzed paragraphs to disk, the preprocessed paragraphs of all processed articles stay in the cache
+    Writer.write_columns(Reader.load_columns(df_paragraphs, paragraphs_path), "paragraphs_sentiment")
+
+    # Add the paragraphs of new articles to the stored aggregates
+    aggregate_store = AggregateStore.update(df_paragraphs, overwrite=args.force_processing)
 
     # Show GUI
     if args.show_gui:
-        gui = SentimentGUI(df_paragraphs)
+        gui = SentimentGUI(df_paragraphs, aggregate_store, paragraphs_path)
         gui.show_gui()
 
     # Compare labeled data with results
@@ -1,7 +1,9 @@
+import hashlib
 import re
 import time
 import warnings
 from pathlib import Path
+from typing import List, Optional, Tuple
 
 import nltk
 import numpy as np
@@ -17,12 +19,17 @@ from tqdm import tqdm
 from model.document_type import DocumentType
 from model.filter_type import FilterType
 from utils.reader import Reader
+from utils.writer import Writer
 
 warnings.simplefilter(action="ignore", category=SettingWithCopyWarning)
 
 
 class Preprocessing:
-    def __init__(self):
+    def __init__(self, batch_size: int = 1000, n_process: int = 1):
+        """
+        :param batch_size: Number of texts that are buffered and parsed together by spacy.
+        :param n_process: Number of processes used by spacy for parsing. If -1, all available cores are used.
+        """
         self.stopwords = spacy.lang.de.stop_words.STOP_WORDS
 
         # de_core_news_lg had the best score for entity recognition and syntax accuracy in german according to spacy.
@@ -30,6 +37,9 @@ class Preprocessing:
         self.nlp = None
         self.sentiws = None
 
+        self.batch_size = batch_size
+        self.n_process = n_process
+
         self.parties = {
             "CDU": ["cdu", "union"],
             "CSU": ["csu"],
@@ -52,6 +62,12 @@ class Preprocessing:
             "Linke": ["linke", "die linke", "den linken"],
         }
 
+        # Every party found by the NER tagging is a synonym contained in the text, so paragraphs that do not match this
+        # pattern cannot yield a party and do not need to be parsed
+        self.party_pattern = re.compile(
+            "|".join([re.escape(synonym) for synonyms in self.parties.values() for synonym in synonyms])
+        )
+
         self.negation_words = [
             "nicht",
             "nie",
@@ -64,64 +80,197 @@ class Preprocessing:
             "trotz",
             "obwohl",
         ]
-        self.negation_pattern = re.compile("|".join(self.negation_words))
 
-    def get_articles(self, df_articles: DataFrame, overwrite: bool = False) -> DataFrame:
+    def get_articles(
+        self, df_articles: DataFrame, overwrite: bool = False, columns: Optional[List[str]] = None
+    ) -> DataFrame:
         """
         Helper function to get a dataframe containing the preprocessed articles.
         :param df_articles: dataframe with the text to preprocess
         :param overwrite: determines if the previous data is allowed to be overwritten. Default is False.
+        :param columns: columns to return, the others can be loaded by the row ids. If None, all columns are returned.
         :return: preprocessed dataframe with preprocessed articles, which is result of method _get_preprocessed_df
         """
-        return self._get_preprocessed_df("articles", df_articles, DocumentType.ARTICLE, overwrite)
+        return self._get_preprocessed_df("articles", df_articles, DocumentType.ARTICLE, overwrite, columns)
 
-    def get_paragraphs(self, df_articles: DataFrame, overwrite: bool = False) -> DataFrame:
+    def get_paragraphs(
+        self, df_articles: DataFrame, overwrite: bool = False, columns: Optional[List[str]] = None
+    ) -> DataFrame:
         """
         Helper function to get a preprocessed dataframe with the paragraphs of the articles.
         :param df_articles: dataframe with the text to preprocess
         :param overwrite: determines if the previous data is allowed to be overwritten. Default is False.
+        :param columns: columns to return, the others can be loaded by the row ids. If None, all columns are returned.
         :return: preprocessed dataframe with preprocessed paragraphs, which is result of method _get_preprocessed_df
         """
-        return self._get_preprocessed_df("paragraphs", df_articles, DocumentType.PARAGRAPH, overwrite)
+        return self._get_preprocessed_df("paragraphs", df_articles, DocumentType.PARAGRAPH, overwrite, columns)
 
-    def get_titles(self, df_articles: DataFrame, overwrite: bool = False) -> DataFrame:
+    def get_titles(
+        self, df_articles: DataFrame, overwrite: bool = False, columns: Optional[List[str]] = None
+    ) -> DataFrame:
         """
         Helper function to get a preprocessed dataframe with the titles of the articles.
         :param df_articles: dataframe with the text to preprocess
         :param overwrite: determines if the previous data is allowed to be overwritten. Default is False.
+        :param columns: columns to return, the others can be loaded by the row ids. If None, all columns are returned.
         :return: preprocessed dataframe, which is result of method _get_preprocessed_df
         """
-        return self._get_preprocessed_df("titles", df_articles, DocumentType.TITLE, overwrite)
+        return self._get_preprocessed_df("titles", df_articles, DocumentType.TITLE, overwrite, columns)
 
     def _get_preprocessed_df(
-        self, preprocessed_filename: str, df_articles: DataFrame, document_type: DocumentType, overwrite: bool
+        self,
+        preprocessed_filename: str,
+        df_articles: DataFrame,
+        document_type: DocumentType,
+        overwrite: bool,
+        columns: Optional[List[str]] = None,
     ) -> DataFrame:
         """
-        Helper function to get the preprocessed pandas dataframe. If the preprocessing already was done ones (JSON files
-        exist) the tagging is not done again but the json files with the perprocessing are read into a pandas dataframe.
-        If preprocessing is proceeded, the result will be stored in a json file. According to the document type, a
-        different preprocessing is done.
-        :param preprocessed_filename: Name of json file to store/ read the results of preprocessing.
+        Helper function to get the preprocessed pandas dataframe. If the preprocessing already was done ones (stored
+        columns or JSON files exist) the tagging is not done again but the stored preprocessing is read into a pandas
+        dataframe. The articles are identified by a hash of their text and metadata, so only new or changed articles
+        are preprocessed and merged with the cached results. If preprocessing is proceeded, the result will be stored in
+        the columnar format of Writer.write_columns together with the hashes of the processed articles. The cache keeps
+        the results of all processed articles, but only the rows of the given articles are returned. The returned rows
+        contain their position in the stored columns (column "row_id"), so further columns can be added with
+        Reader.load_columns from get_columns_path. According to the document type, a different preprocessing is done.
+        :param preprocessed_filename: Name of the files to store/ read the results of preprocessing.
         :param df_articles: Dataframe with the text to preprocess, if the data still needs to be preprocessed.
         :param document_type: Type of the document that is going to be preprocessed.
         :param overwrite: Determines if the previous data is allowed to be overwritten.
+        :param columns: Columns of the returned dataframe (with the article hash, the article index and the row ids).
+        If None, all columns are returned.
         :return: df_preprocessed: Pandas dataframe of the preprocessed input.
         """
+        columns_path = self.get_columns_path(preprocessed_filename)
         json_path = "src/output/" + preprocessed_filename + ".json"
+        hashes_path = "src/output/" + preprocessed_filename + "_hashes.json"
+
+        df_articles = df_articles.reset_index(drop=True)
+        df_articles["article_hash"] = self._hash_articles(df_articles)
+
+        key_columns = ["article_hash", "media", "title", "date"]
+        df_cached = None
+        df_processed_articles = DataFrame(columns=key_columns)
+
+        # The article hash and the article index are needed to select the rows of the given articles
+        read_columns = None if columns is None else columns + ["article_hash", "article_index"]
+
+        if Path(columns_path).is_dir() and not overwrite:
+            df_cached = Reader.read_columns(columns_path, read_columns, row_ids=True)
+        elif Path(json_path).exists() and not overwrite:
+            df_cached = Reader.read_json_to_df_default(json_path)
 
-        if Path(json_path).exists() and not overwrite:
-            return Reader.read_json_to_df_default(json_path)
+        if df_cached is not None:
+            # Cache without hashes of the processed articles (older format), reuse it as it is
+            if not Path(hashes_path).exists() or "article_hash" not in df_cached:
+                return df_cached
 
-        if document_type.value == DocumentType.ARTICLE.value:
-            df_preprocessed = self._apply_preprocessing(df_articles, document_type, FilterType.PARTIES)
+            df_processed_articles = Reader.read_json_to_df_default(hashes_path).reindex(columns=key_columns)
+
+        # Only new or changed articles have to be preprocessed
+        df_new_articles = df_articles[~df_articles["article_hash"].isin(df_processed_articles["article_hash"])]
+        df_new_articles = df_new_articles.reset_index(drop=True)
+
+        if df_cached is not None and len(df_new_articles) == 0:
+            return self._select_articles(df_cached, df_articles)
+
+        print("Number of new or changed articles to preprocess: {}".format(len(df_new_articles)))
+
+        if len(df_new_articles) == 0:
+            df_preprocessed = DataFrame()
+        elif document_type.value == DocumentType.ARTICLE.value:
+            df_preprocessed = self._apply_preprocessing(df_new_articles, document_type, FilterType.PARTIES)
         elif document_type.value == DocumentType.PARAGRAPH.value:
-            df_preprocessed = self._preprocess_paragraphs(df_articles)
+            df_preprocessed = self._preprocess_paragraphs(df_new_articles)
         else:
-            df_articles = df_articles[["title", "media"]].rename(columns={"title": "text"})
-            df_preprocessed = self._apply_preprocessing(df_articles, document_type, FilterType.NONE)
+            df_titles = df_new_articles[["title", "media", "article_hash"]].rename(columns={"title": "text"})
+            df_preprocessed = self._apply_preprocessing(df_titles, document_type, FilterType.NONE)
+
+        # A processed article with the same media, title and date as a new article is an outdated version of it
+        df_new_keys = df_new_articles[key_columns].astype(str)
+        new_keys = set(zip(df_new_keys["media"], df_new_keys["title"], df_new_keys["date"]))
+        processed_keys = zip(
+            df_processed_articles["media"], df_processed_articles["title"], df_processed_articles["date"]
+        )
+        outdated = [key in new_keys for key in processed_keys]
+        df_processed_articles = pd.concat(
+            [df_processed_articles[~np.array(outdated, dtype=bool)], df_new_keys],
+            ignore_index=True,
+        )
+
+        # Merge the cached results of the unchanged articles with the new results
+        if df_cached is not None:
+            if Reader.row_id_column in df_cached:
+                df_cached = Reader.load_columns(df_cached, columns_path).drop(columns=Reader.row_id_column)
+
+            df_cached = df_cached[df_cached["article_hash"].isin(df_processed_articles["article_hash"])]
+            df_preprocessed = pd.concat([df_cached, df_preprocessed], ignore_index=True)
+
+        Writer.write_columns(df_preprocessed, preprocessed_filename)
+        Writer.write_dataframe(df_processed_articles, preprocessed_filename + "_hashes")
+
+        # The rows are identified by their position in the stored columns, like the rows read from them
+        df_preprocessed = df_preprocessed.assign(**{Reader.row_id_column: np.arange(len(df_preprocessed))})
+
+        if read_columns is not None:
+            read_columns.append(Reader.row_id_column)
+            df_preprocessed = df_preprocessed[[column for column in df_preprocessed if column in read_columns]]
+
+        return self._select_articles(df_preprocessed, df_articles)
+
+    @staticmethod
+    def get_columns_path(preprocessed_filename: str) -> str:
+        """
+        Get the directory of the stored columns of the preprocessed results.
+        :param preprocessed_filename: Name of the files to store/ read the results of preprocessing.
+        :return: Path of the directory.
+        """
+        return "src/output/" + preprocessed_filename
+
+    @staticmethod
+    def _select_articles(df_preprocessed: DataFrame, df_articles: DataFrame) -> DataFrame:
+        """
+        Selects the preprocessed rows of the given articles from the cached results of all processed articles and
+        points their article index to the position of their article in the given articles.
+        :param df_preprocessed: dataframe with the preprocessed rows and their article hash.
+        :param df_articles: dataframe with the current articles and their article hash.
+        :return: dataframe with the preprocessed rows of the current articles.
+        """
+        if "article_hash" not in df_preprocessed:
+            return df_preprocessed
+
+        selected = df_preprocessed["article_hash"].isin(df_articles["article_hash"]).to_numpy()
+
+        if not selected.all():
+            df_preprocessed = df_preprocessed[selected]
+
+        if "article_index" in df_preprocessed:
+            article_positions = dict(zip(df_articles["article_hash"][::-1], df_articles.index[::-1]))
+            df_preprocessed = df_preprocessed.assign(
+                article_index=df_preprocessed["article_hash"].map(article_positions).astype(np.int64)
+            )
 
         return df_preprocessed
 
+    def _hash_articles(self, df_articles: DataFrame) -> Series:
+        """
+        Calculates a hash of the text and the metadata (title, media and date) of each article. The hash identifies the
+        content of an article, so articles that were already preprocessed can be recognized.
+        :param df_articles: dataframe with the articles to hash.
+        :return: series with the hex digest of each article.
+        """
+        columns = [
+            df_articles[column] if column in df_articles else None for column in ["title", "text", "media", "date"]
+        ]
+        columns = [column.astype(str) if column is not None else [""] * len(df_articles) for column in columns]
+
+        return Series(
+            [hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest() for values in zip(*columns)],
+            index=df_articles.index,
+            dtype=object,
+        )
+
     def _apply_preprocessing(
         self, dataframe: DataFrame, document_type: DocumentType, filter_type: FilterType
     ) -> DataFrame:
@@ -132,11 +281,7 @@ class Preprocessing:
         :param filter_type: Specifies if documents with no parties or multiple parties should be removed.
         :return: Preprocessed dataframe.
         """
-        self.nlp = spacy.load("de_core_news_lg", disable=["parser"])
-        self.sentiws = spaCySentiWS(sentiws_path="src/data/sentiws/")
-        self.nlp.add_pipe(self.sentiws)
-
-        nltk.download("punkt")
+        self._load_pipeline()
 
         print("Start of preprocessing")
         start_time = time.time()
@@ -159,14 +304,20 @@ class Preprocessing:
         # Remove special characters
         df_preprocessed["text"] = self._remove_special_characters(df_preprocessed["text"])
 
-        # Tokenization
-        df_preprocessed["text"] = self._tokenization(df_preprocessed["text"])
-
-        # Get persons
-        df_preprocessed["persons"] = self._tag_persons(df_preprocessed["text"])
-
-        # Get organizations
-        df_preprocessed["organizations"] = self._tag_organizations(df_preprocessed["text"])
+        # Remove rows that cannot contain a party before the expensive nlp pipeline is applied
+        if filter_type.value != FilterType.NONE.value:
+            party_candidates = self._get_party_candidates(df_preprocessed["text"])
+            print("Party pre-filter keeps {} of {} documents".format(party_candidates.sum(), len(party_candidates)))
+            df_preprocessed = df_preprocessed.loc[party_candidates]
+
+        # Tokenization and extraction of persons, organizations, SentiWS polarity, POS tags, nouns and lemmas
+        df_features = self._extract_features(df_preprocessed["text"])
+        df_preprocessed["text"] = df_features["lemmas"]
+        df_preprocessed["persons"] = df_features["persons"]
+        df_preprocessed["organizations"] = df_features["organizations"]
+        df_preprocessed["polarity"] = df_features["polarity"]
+        df_preprocessed["pos_tags"] = df_features["pos_tags"]
+        df_preprocessed["nouns"] = df_features["nouns"]
 
         # Get parties
         df_preprocessed["parties"] = self._get_parties(df_preprocessed["organizations"])
@@ -179,21 +330,9 @@ class Preprocessing:
         if filter_type.value == FilterType.SINGLE_PARTY.value:
             df_preprocessed = self._keep_rows_with_one_party(df_preprocessed)
 
-        # Sentiment polarity sentiws
-        df_preprocessed["polarity"] = self._determine_polarity_sentiws(df_preprocessed["text"])
-
         # Sentiment polarity TextBlob
         df_preprocessed["polarity_textblob"] = self._determine_polarity_textblob(df_preprocessed["original_text"])
 
-        # POS tagging
-        df_preprocessed["pos_tags"] = self._pos_tagging(df_preprocessed["text"])
-
-        # Get nouns
-        df_preprocessed["nouns"] = self._get_nouns(df_preprocessed["text"])
-
-        # Lemmatization
-        df_preprocessed["text"] = self._lemmatizing(df_preprocessed["text"])
-
         # Negation handling
         df_preprocessed = self._negation_handling(df_preprocessed)
 
@@ -205,6 +344,45 @@ class Preprocessing:
 
         return df_preprocessed
 
+    def evaluate_party_prefilter(self, df_articles: DataFrame, number_of_samples: int = 1000) -> Tuple[float, float]:
+        """
+        Compares the lexical party pre-filter with the NER based party filter on a sample of paragraphs. Reports how many
+        of the paragraphs with a tagged party are kept by the pre-filter (recall) and how many paragraphs are skipped
+        before parsing (saved nlp work).
+        :param df_articles: dataframe with articles that are split up in paragraphs for the evaluation.
+        :param number_of_samples: number of paragraphs to evaluate.
+        :return: tuple of the recall and the share of skipped paragraphs.
+        """
+        self._load_pipeline()
+
+        dataframe = self._split_paragraphs(df_articles)
+        dataframe = self._remove_quotations_rows(dataframe)
+        dataframe = dataframe.sample(min(number_of_samples, len(dataframe)), random_state=0)
+        text_series = self._remove_special_characters(dataframe["text"])
+
+        party_candidates = self._get_party_candidates(text_series)
+        organizations = self._extract_features(text_series)["organizations"]
+        has_party = self._get_parties(organizations).apply(len) > 0
+
+        recall = (party_candidates & has_party).sum() / max(has_party.sum(), 1)
+        skipped = 1 - party_candidates.sum() / max(len(party_candidates), 1)
+
+        print("==================== Party pre-filter ====================\n")
+        print("Paragraphs with tagged parties: {} of {}".format(has_party.sum(), len(has_party)))
+        print("Recall: {}".format(recall))
+        print("Skipped paragraphs (saved nlp work): {}".format(skipped))
+        return recall, skipped
+
+    def _load_pipeline(self) -> None:
+        """
+        Loads the spacy pipeline including the SentiWS component.
+        """
+        self.nlp = spacy.load("de_core_news_lg", disable=["parser"])
+        self.sentiws = spaCySentiWS(sentiws_path="src/data/sentiws/")
+        self.nlp.add_pipe(self.sentiws)
+
+        nltk.download("punkt")
+
     def _preprocess_paragraphs(self, df_articles: DataFrame) -> DataFrame:
         """
         Helper function that splits up paragraphs and stores them with the original article in a dataframe. After that
@@ -212,6 +390,15 @@ class Preprocessing:
         :param df_articles: dataframe with articles that need to be split up in paragraphs.
         :return: dataframe with preprocessed articles, split up by paragraph.
         """
+        dataframe = self._split_paragraphs(df_articles)
+        return self._apply_preprocessing(dataframe, DocumentType.PARAGRAPH, FilterType.PARTIES)
+
+    def _split_paragraphs(self, df_articles: DataFrame) -> DataFrame:
+        """
+        Splits up the articles in paragraphs and stores them with the original article index, title, media and date.
+        :param df_articles: dataframe with articles that need to be split up in paragraphs.
+        :return: dataframe with one paragraph per row.
+        """
         # Split articles into paragraphs by splitting at newlines
         paragraphs = list(map(lambda text: text.replace("\n+", "\n").split("\n"), df_articles["text"]))
         flat_list = [(index, item) for index, sublist in enumerate(paragraphs) for item in sublist]
@@ -225,7 +412,12 @@ class Preprocessing:
         dataframe["media"] = dataframe["article_index"].apply(lambda index: df_articles["media"][index])
         dataframe["date"] = dataframe["article_index"].apply(lambda index: df_articles["date"][index])
 
-        return self._apply_preprocessing(dataframe, DocumentType.PARAGRAPH, FilterType.PARTIES)
+        if "article_hash" in df_articles:
+            dataframe["article_hash"] = dataframe["article_index"].apply(
+                lambda index: df_articles["article_hash"][index]
+            )
+
+        return dataframe
 
     def _remove_direct_quotations(self, text_series: Series) -> Series:
         """
@@ -268,62 +460,39 @@ class Preprocessing:
             lambda row: " ".join(word for word in row.split() if word not in self.stopwords)
         )
 
-    def _tokenization(self, text_series: Series) -> Series:
+    def _extract_features(self, text_series: Series) -> DataFrame:
         """
-        tokenization is performed on the incoming series
-        :param text_series:  series, containing the text where the tokenization is performed on
-        :return: series, having the text transformed into tokens
+        Parses the texts and extracts all token based features in a single pass over each document. The documents are
+        not stored, so each of them can be released as soon as its features are extracted.
+        :param text_series: series, containing the text where the features should be extracted from
+        :return: dataframe with the columns persons, organizations, polarity, pos_tags, nouns and lemmas
         """
-        tqdm.pandas(desc="Tokenization")
-        return text_series.progress_apply(lambda row: self.nlp(row))
+        docs = self.nlp.pipe(text_series, batch_size=self.batch_size, n_process=self.n_process)
+        rows = []
 
-    def _pos_tagging(self, token_series: Series) -> Series:
-        """
-        POS-Tagging is performed on the incoming series
-        :param token_series: series, containing text for pos-tagging
-        :return: series, containing pos tags for each word in row
-        """
-        tqdm.pandas(desc="POS Tagging")
-        return token_series.progress_apply(lambda doc: [token.tag_ for token in doc])
+        for doc in tqdm(docs, total=len(text_series), desc="Tokenization and feature extraction"):
+            polarity = []
+            pos_tags = []
+            nouns = []
+            lemmas = []
 
-    def _lemmatizing(self, token_series: Series) -> Series:
-        """
-        Performs lemmatizing on incoming series
-        :param token_series: series, containing the tokens where lemmatizing should be performed on
-        :return: series, containing lammatized tags for each word in row
-        """
-        tqdm.pandas(desc="Lemmatization")
-        return token_series.progress_apply(lambda doc: [token.lemma_.lower() for token in doc])
+            for token in doc:
+                lemma = token.lemma_.lower()
+                polarity.append(token._.sentiws)
+                pos_tags.append(token.tag_)
+                lemmas.append(lemma)
 
-    def _get_nouns(self, token_series: Series) -> Series:
-        """
-        filters nouns based in pos_tagging
-        :param token_series: series, containing pos tags
-        :return: series, containing only nouns
-        """
-        tqdm.pandas(desc="Get nouns")
-        return token_series.progress_apply(lambda doc: [token.lemma_.lower() for token in doc if token.tag_ == "NN"])
+                if token.tag_ == "NN":
+                    nouns.append(lemma)
 
-    def _tag_persons(self, token_series: Series) -> Series:
-        """
-        filters persons out of token series
-        :param token_series: series, containing text where persons should be filtered
-        :return: series, containing persons for each row
-        """
-        tqdm.pandas(desc="Tag persons")
-        return token_series.progress_apply(
-            lambda doc: list(set([entity.text for entity in doc.ents if entity.label_ == "PER"]))
-        )
+            persons = list(set([entity.text for entity in doc.ents if entity.label_ == "PER"]))
+            organizations = list(set([entity.text for entity in doc.ents if entity.label_ == "ORG"]))
+            rows.append((persons, organizations, polarity, pos_tags, nouns, lemmas))
 
-    def _tag_organizations(self, token_series: Series) -> Series:
-        """
-        filters organizations out of token series
-        :param token_series: series, containing text where organizations should be filtered
-        :return: series, containing organizations for each row
-        """
-        tqdm.pandas(desc="Tag organizations")
-        return token_series.progress_apply(
-            lambda doc: list(set([entity.text for entity in doc.ents if entity.label_ == "ORG"]))
+        return DataFrame(
+            rows,
+            columns=["persons", "organizations", "polarity", "pos_tags", "nouns", "lemmas"],
+            index=text_series.index,
         )
 
     def _get_parties(self, organization_series: Series) -> Series:
@@ -338,6 +507,15 @@ class Preprocessing:
             lambda row: [party for party, synonyms in self.parties.items() if any(x in synonyms for x in row)]
         )
 
+    def _get_party_candidates(self, text_series: Series) -> Series:
+        """
+        Lexical pre-filter that checks if any synonym of a party occurs in the text. Texts that do not match cannot
+        yield a party in the NER based party extraction.
+        :param text_series: series, containing the text without special characters
+        :return: boolean series, True if the text might contain a party
+        """
+        return text_series.str.lower().str.contains(self.party_pattern).fillna(False).astype(bool)
+
     def _remove_rows_without_parties(self, dataframe: DataFrame) -> DataFrame:
         """
         all rows, that do not contain parties are removed
@@ -354,15 +532,6 @@ class Preprocessing:
         """
         return dataframe.loc[np.array(list(map(len, dataframe.parties.values))) == 1]
 
-    def _determine_polarity_sentiws(self, token_series: Series) -> Series:
-        """
-        for each word in a row of the series, the polarity is calculated with sentiws.
-        :param token_series: series, containing the tokens which need to be calculated
-        :return: series, containing rows with the polarities for each token
-        """
-        tqdm.pandas(desc="Determine sentiment polarity with SentiWS")
-        return token_series.progress_apply(lambda doc: [token._.sentiws for token in doc])
-
     def _determine_polarity_textblob(self, text_series: Series) -> Series:
         """
         for each paragraph (row in a series) the polarity is calculated with textblob
@@ -372,35 +541,48 @@ class Preprocessing:
         tqdm.pandas(desc="Determine sentiment polarity with TextBlob")
         return text_series.progress_apply(lambda doc: TextBlobDE(doc).sentiment[0])
 
-    def _negation_handling(self, df_preprocessed: DataFrame) -> DataFrame:
+    def _negation_handling(self, df_preprocessed: DataFrame, window: int = 4) -> DataFrame:
         """
         Checks if 4 tokens before or after sentiws assigned a polarity score a negation word can be found. If this is the
-        case, the polarity is inverted.
+        case, the polarity is inverted. The tokens of all documents are flattened, so the negation words and the windows
+        around them are determined with array operations over the whole corpus.
         :param df_preprocessed: Dataframe containing scores from sentiws for each word.
+        :param window: number of tokens before and after a polar token that are searched for negation words.
         :return: Dataframe with inverted scores if a negation word could be found.
         """
         polarity_array = df_preprocessed["polarity"].to_numpy()
         word_array = df_preprocessed["text"].to_numpy()
 
-        for entry in range(len(polarity_array)):
-            for i in range(len(polarity_array[entry])):
-                if polarity_array[entry][i] is not None:
-                    backward_window = i - 4
-                    forward_window = i + 4
-
-                    if backward_window < 0:
-                        backward_window = 0
-                    if forward_window >= len(polarity_array[entry]):
-                        forward_window = len(polarity_array[entry])
-
-                    words_in_window = word_array[entry][backward_window:forward_window]
-                    words_in_window = " ".join(map(str, words_in_window))
-
-                    if self.negation_pattern.search(words_in_window):
-                        if polarity_array[entry][i] < 0:
-                            polarity_array[entry][i] = abs(polarity_array[entry][i])
-                        elif polarity_array[entry][i] > 0:
-                            polarity_array[entry][i] = -polarity_array[entry][i]
+        lengths = np.array([len(polarity) for polarity in polarity_array], dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+
+        # Only whole tokens are compared with the negation words
+        negation_words = set(self.negation_words)
+        is_negation = np.fromiter(
+            (str(word).lower() in negation_words for words in word_array for word in words),
+            dtype=bool,
+            count=int(offsets[-1]),
+        )
+
+        # Count the negation words in the window of every token with prefix sums, limited to the bounds of its document
+        negation_counts = np.zeros(len(is_negation) + 1, dtype=np.int64)
+        negation_counts[1:] = np.cumsum(is_negation)
+        positions = np.arange(len(is_negation))
+        starts = np.repeat(offsets[:-1], lengths)
+        ends = np.repeat(offsets[1:], lengths)
+        window_start = np.maximum(positions - window, starts)
+        window_end = np.minimum(positions + window + 1, ends)
+        is_negated = negation_counts[window_end] > negation_counts[window_start]
+
+        polarity = np.array(
+            [np.nan if value is None else value for values in polarity_array for value in values], dtype=np.float64
+        )
+        is_missing = np.isnan(polarity)
+        polarity = np.where(is_negated & (polarity != 0), -polarity, polarity).astype(object)
+        polarity[is_missing] = None
+        polarity_array = np.empty(len(lengths), dtype=object)
+        polarity_array[:] = [polarity[offsets[row] : offsets[row + 1]].tolist() for row in range(len(lengths))]
 
         df_preprocessed.drop("polarity", inplace=True, axis=1)
         polarity_data = DataFrame(data=polarity_array, columns=["polarity"])
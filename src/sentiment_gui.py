@@ -1,7 +1,7 @@
 import datetime
 import tkinter
 import webbrowser
-from typing import List
+from typing import List, Optional
 
 import matplotlib.pyplot as plt
 import pandas as pd
@@ -11,6 +11,9 @@ from time_course import TimeCourse
 
 from keyword_extraction import KeywordExtraction
 from model.plot_type import PlotType
+from utils.aggregate_store import AggregateStore
+from utils.aggregation_cube import AggregationCube
+from utils.group_index import GroupIndex
 from utils.visualization import Visualization
 
 
@@ -19,14 +22,29 @@ class SentimentGUI:
     Class that creates a GUI to visualize the results of the news analysis with different filter criteria
     """
 
-    def __init__(self, df_paragraphs: DataFrame):
+    def __init__(
+        self,
+        df_paragraphs: DataFrame,
+        aggregate_store: Optional[AggregateStore] = None,
+        column_path: Optional[str] = None,
+    ):
         """
-        :param df_paragraphs: processed dataframe with analysis results
+        :param df_paragraphs: processed dataframe with analysis results, only used by the topic and time course views
+        :param aggregate_store: stored aggregates of the paragraphs, statistics, sentiment and the date range are
+        answered from them. If None, the paragraphs are aggregated once
+        :param column_path: directory of the stored columns the paragraphs were read from, the nouns and the text are
+        read from it if they are not loaded
         """
         self.df_paragraphs = df_paragraphs
-        self.df_paragraphs_configured = df_paragraphs.copy()
-        self.keyword_extraction = KeywordExtraction(self.df_paragraphs_configured)
-        self.time_course = TimeCourse()
+        self.aggregate_store = aggregate_store
+        if self.aggregate_store is None:
+            self.aggregate_store = AggregateStore(AggregateStore.aggregate(df_paragraphs), [])
+        self.column_path = column_path
+        # the paragraphs are filtered and indexed when the first topic or time course view is shown
+        self.df_paragraphs_configured = None
+        self.group_index = None
+        self.keyword_extraction = None
+        self.time_course = None
         self.plots = []
         self.current_plot = None
         self.current_plot_index = 0
@@ -92,10 +110,24 @@ class SentimentGUI:
         if a time filter is set in GUI, only articles within this timespan are considered.
         Other articles are filtered out in this method
         """
+        self._setup_paragraphs()
         self.df_paragraphs_configured = self.df_paragraphs
         if self.date_check.get() == 1:
             self.filter_time(self.entry_date_from.get(), self.entry_date_to.get())
 
+    def _setup_paragraphs(self) -> None:
+        """
+        Indexes the parties and media of the paragraphs once for the topic and time course views, filtered dataframes
+        select their rows from this index
+        """
+        if self.group_index is not None:
+            return
+        self.group_index = GroupIndex.from_dataframe(self.df_paragraphs)
+        self.keyword_extraction = KeywordExtraction(
+            self.df_paragraphs, group_index=self.group_index, column_path=self.column_path
+        )
+        self.time_course = TimeCourse(self.group_index, self.column_path)
+
     def filter_time(self, min_date: str = None, max_date: str = None) -> None:
         """
         Filer data frame to contain only articles from a certain time period
@@ -114,6 +146,24 @@ class SentimentGUI:
                 self.df_paragraphs_configured["date"] > "2019-10-01"
             ]
 
+    def get_cube(self) -> AggregationCube:
+        """
+        Counts the paragraphs within the time filter set in GUI. The counts are taken from the aggregates without
+        filtering the paragraphs.
+        :return: counts of the paragraphs by party, media and sentiment
+        """
+        if self.date_check.get() != 1:
+            return self.aggregate_store.get_cube()
+
+        min_date = self.entry_date_from.get()
+        max_date = self.entry_date_to.get()
+
+        if min_date and max_date:
+            return self.aggregate_store.get_cube(min_date=min_date, max_date=max_date)
+
+        # same default time span as filter_time
+        return self.aggregate_store.get_cube(min_date="2019-10-01")
+
     def clear_plots(self, clear_plot_array: bool = False) -> None:
         """
         Clears the plot in the GUI and optionally also the array with all current plots
@@ -214,16 +264,11 @@ class SentimentGUI:
         party_list = self.get_parties()
         media_list = self.get_media()
 
-        # filter time
-        self.configure_dataframe()
-
-        basic_figure = Visualization.get_basic_statistic_bar_plot(self.df_paragraphs_configured, party_list, media_list)
-        media_figures = Visualization.get_media_statistics_bar_plots(
-            self.df_paragraphs_configured, party_list, media_list
-        )
-        party_figures = Visualization.get_party_statistics_bar_plots(
-            self.df_paragraphs_configured, party_list, media_list
-        )
+        # count the paragraphs once, all bar charts are sliced from the counts
+        cube = self.get_cube()
+        basic_figure = Visualization.get_basic_statistic_bar_plot(self.df_paragraphs, party_list, media_list, cube)
+        media_figures = Visualization.get_media_statistics_bar_plots(self.df_paragraphs, party_list, media_list, cube)
+        party_figures = Visualization.get_party_statistics_bar_plots(self.df_paragraphs, party_list, media_list, cube)
 
         figures = [basic_figure] + media_figures + party_figures
 
@@ -251,11 +296,9 @@ class SentimentGUI:
         # get currently enabled parties and media
         party_list = self.get_parties()
         media_list = self.get_media()
-        # filter time
-        self.configure_dataframe()
         # get the pie charts from visualization class
         figures = Visualization.get_sentiment_pie_charts(
-            self.df_paragraphs_configured, by_party=by_party, parties=party_list, media=media_list
+            self.df_paragraphs, by_party=by_party, parties=party_list, media=media_list, cube=self.get_cube()
         )
         # get canvas to show in gui from each of the figures and store it in plots array
         for fig in figures:
@@ -415,14 +458,13 @@ class SentimentGUI:
         Sets the dates in the text fields to the minimum and maximum of the current dataframe if text filtering is
         checked, otherwise clears textfield
         """
-        # set date textfields to minimum and maximum of available news data
+        # set date textfields to minimum and maximum of available news data (same default time span as filter_time)
         if self.date_check.get() == 1:
-            self.filter_time()
-            self.entry_date_from.insert(tkinter.END, min(self.df_paragraphs_configured["date"]))
-            self.entry_date_to.insert(tkinter.END, max(self.df_paragraphs_configured["date"]))
+            min_date, max_date = self.aggregate_store.get_date_range(min_date="2019-10-01")
+            self.entry_date_from.insert(tkinter.END, min_date or "")
+            self.entry_date_to.insert(tkinter.END, max_date or "")
         # clear date textfields
         else:
-            self.df_paragraphs_configured = self.df_paragraphs
             self.entry_date_from.delete(0, "end")
             self.entry_date_to.delete(0, "end")
 
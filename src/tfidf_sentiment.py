@@ -1,5 +1,13 @@
+from typing import Optional, Tuple
+
 import numpy as np
-from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+import pandas as pd
+from pandas import Series
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfTransformer
+
+from utils.sentiment_metrics import SENTIMENT_LABELS
+from utils.token_ids import TokenIds
 
 
 class TfidfSentiment:
@@ -7,8 +15,15 @@ class TfidfSentiment:
     Class that calculates the sentiment of the paragraphs.
     """
 
-    def __init__(self, df_paragraphs):
+    def __init__(self, df_paragraphs, column_path: Optional[str] = None):
+        """
+        :param df_paragraphs: the paragraphs to analyze.
+        :param column_path: the directory of the stored columns the paragraphs were read from, token columns that are
+        not loaded are read from it as token ids.
+        """
         self.df_paragraphs = df_paragraphs
+        self.column_path = column_path
+        self.parties = ["cdu", "union", "csu", "spd", "sozialdemokrat", "grün", "fdp", "liberale", "afd", "linke"]
 
     def calculate_sentiment_score(self, overwrite: bool = False) -> None:
         """
@@ -19,20 +34,85 @@ class TfidfSentiment:
         :param overwrite: If True, overwrites the current sentiment.
         """
 
-        # Sentiment already calculated
-        if "sentiment_score" in self.df_paragraphs and not overwrite:
+        # Sentiment already calculated for all paragraphs
+        if (
+            "sentiment_score" in self.df_paragraphs
+            and self.df_paragraphs["sentiment_score"].notna().all()
+            and not overwrite
+        ):
             return
 
-        # Get text from dataframe
-        self.df_paragraphs["text"] = self.df_paragraphs["text"].apply(
-            lambda row: [self._remove_umlauts(word) for word in row]
+        # Get tf-idf weight of each token
+        tokens = TokenIds.from_dataframe(self.df_paragraphs, "text", self.column_path)
+        offsets = tokens.offsets
+        token_weights = self._get_token_weights(tokens)
+
+        # Save tfidf score for each word
+        self.df_paragraphs["tfidf"] = self._split_lists(token_weights, offsets)
+
+        # Replace nan polarity values with 0
+        polarity = self._flatten_lists(self.df_paragraphs["polarity"], np.float64)[0]
+        self.df_paragraphs["polarity"] = self._split_lists(polarity, offsets)
+        polarities = [polarity]
+
+        if "polarity_context" in self.df_paragraphs:
+            polarity_context = self._flatten_lists(self.df_paragraphs["polarity_context"], np.float64)[0]
+            self.df_paragraphs["polarity_context"] = self._split_lists(polarity_context, offsets)
+            polarities.append(polarity_context)
+
+        # Calculate the sentiment scores from the dot products of polarity and tfidf of each paragraph at once
+        tfidf_matrix = csr_matrix(
+            (token_weights, np.arange(len(token_weights)), offsets), shape=(len(offsets) - 1, len(token_weights))
         )
+        sentiment_scores = tfidf_matrix @ np.column_stack(polarities)
 
-        text = self.df_paragraphs["text"].apply(lambda row: " ".join(row))
+        self.df_paragraphs["sentiment_score"] = sentiment_scores[:, 0]
 
-        # Vectorize character_words
-        vectorizer = CountVectorizer(tokenizer=lambda y: y.split())
-        count_vectorized = vectorizer.fit_transform(text)
+        # Calculate context sentiment score from dot product of polarity and tfidf
+        if "polarity_context" in self.df_paragraphs:
+            self.df_paragraphs["sentiment_score_context"] = sentiment_scores[:, 1]
+
+    def get_context_scores(self, max_window: int) -> np.ndarray:
+        """
+        Calculates the context sentiment score of each paragraph for all window sizes from 0 to max_window at once.
+        The distance of each token to the nearest party is determined only once, so the score for a window is the
+        cumulative sum of the token scores up to this distance.
+
+        :param max_window: The biggest window size (max distance between a word and a party).
+        :return: Array containing the context sentiment score of each paragraph (rows) for each window size (columns).
+        """
+        tokens = TokenIds.from_dataframe(self.df_paragraphs, "text", self.column_path)
+        party_distances = self._get_party_distances(tokens)[0]
+
+        polarity = self._flatten_lists(self.df_paragraphs["polarity"], np.float64)[0]
+        token_scores = self._get_token_weights(tokens) * polarity
+
+        # Sum up the token scores of each paragraph by their distance to a party, more distant tokens are ignored
+        distances = np.minimum(party_distances, max_window + 1).astype(np.int64)
+        distance_scores = np.bincount(
+            tokens.rows() * (max_window + 2) + distances,
+            weights=token_scores,
+            minlength=len(tokens) * (max_window + 2),
+        ).reshape(len(tokens), max_window + 2)
+
+        return np.cumsum(distance_scores, axis=1)[:, : max_window + 1]
+
+    def _get_token_weights(self, tokens: TokenIds) -> np.ndarray:
+        """
+        Calculates the mean tf-idf weight of the term of each token over all paragraphs.
+
+        :param tokens: Token ids of the text of all paragraphs.
+        :return: Array containing the weight of each token.
+        """
+        # Terms are compared without umlauts and case, the umlauts are removed once for each entry of the vocabulary
+        terms, term_ids = tokens.vocabulary.map_vocabulary(lambda term: self._remove_umlauts(str(term)).lower())
+        token_terms = term_ids[tokens.ids]
+
+        # Whitespace tokens are no terms
+        is_term = terms.map_terms(lambda term: bool(term.strip()), bool)
+
+        # Count the terms of each paragraph
+        count_vectorized = tokens.count_matrix(term_ids, len(terms), is_term[term_ids])
 
         # Apply tf-idf to count_vectorized
         transformer = TfidfTransformer(smooth_idf=True, use_idf=True)
@@ -40,37 +120,43 @@ class TfidfSentiment:
         # Generate tf-idf for the given document
         tf_idf_vector = transformer.fit_transform(count_vectorized)
 
-        # Get tf-idf weights
-        weights = np.asarray(tf_idf_vector.mean(axis=0)).ravel().tolist()
+        # Get tf-idf weights of each term and each token
+        weights = np.asarray(tf_idf_vector.mean(axis=0)).ravel()
+        return np.where(is_term[token_terms], weights[token_terms], 0)
 
-        # Get term-tfidf dictionary
-        dict_weights = dict(zip(vectorizer.get_feature_names(), weights))
+    def _flatten_lists(self, series: Series, dtype: Optional[type] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Concatenates the lists of all rows into one array.
 
-        # Save tfidf score for each word
-        self.df_paragraphs["tfidf"] = self.df_paragraphs["text"].apply(
-            lambda row: [dict_weights[word] for word in row if word != " "]
-        )
+        :param series: Series containing a list in each row.
+        :param dtype: Type of the values. If the type is numeric, None values are replaced with 0.
+        :return: Tuple of the concatenated values and the offsets of the rows in it.
+        """
+        lists = series.tolist()
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(values) for values in lists])
 
-        # Replace nan polarity values with 0
-        self.df_paragraphs["polarity"] = self.df_paragraphs["polarity"].apply(
-            lambda row: [0 if x is None else x for x in row]
-        )
+        if dtype is None:
+            values = np.empty(offsets[-1], dtype=object)
+            values[:] = [value for values in lists for value in values]
+        else:
+            values = np.fromiter(
+                (0 if value is None else value for values in lists for value in values), dtype=dtype, count=offsets[-1]
+            )
 
-        # Calculate sentiment score from dot product of polarity and tfidf
-        self.df_paragraphs["sentiment_score"] = self.df_paragraphs.apply(
-            lambda row: np.dot(row["polarity"], row["tfidf"]), axis=1
-        )
+        return values, offsets
 
-        # Calculate context sentiment score from dot product of polarity and tfidf
-        if "polarity_context" in self.df_paragraphs:
-            # Replace nan polarity values with 0
-            self.df_paragraphs["polarity_context"] = self.df_paragraphs["polarity_context"].apply(
-                lambda row: [0 if x is None else x for x in row]
-            )
+    def _split_lists(self, values: np.ndarray, offsets: np.ndarray) -> Series:
+        """
+        Splits concatenated values into a list for each row of the dataframe.
 
-            self.df_paragraphs["sentiment_score_context"] = self.df_paragraphs.apply(
-                lambda row: np.dot(row["polarity_context"], row["tfidf"]), axis=1
-            )
+        :param values: Concatenated values of all rows.
+        :param offsets: Offsets of the rows in the values.
+        :return: Series containing a list in each row.
+        """
+        lists = np.empty(len(offsets) - 1, dtype=object)
+        lists[:] = [values[offsets[row] : offsets[row + 1]].tolist() for row in range(len(offsets) - 1)]
+        return Series(lists, index=self.df_paragraphs.index)
 
     def get_context_polarity(self, threshold: int) -> None:
         """
@@ -79,76 +165,95 @@ class TfidfSentiment:
 
         :param threshold: Max distance between current word and party index.
         """
-        parties = ["cdu", "union", "csu", "spd", "sozialdemokrat", "grün", "fdp", "liberale", "afd", "linke"]
+        tokens = TokenIds.from_dataframe(self.df_paragraphs, "text", self.column_path)
+        party_distances, party_indices = self._get_party_distances(tokens)
+        polarity, offsets = self._flatten_lists(self.df_paragraphs["polarity"])
 
-        self.df_paragraphs["party_indices"] = self.df_paragraphs["text"].apply(
-            lambda row: [i for i, x in enumerate(row) if x in parties]
-        )
+        self.df_paragraphs["party_indices"] = party_indices
 
-        self.df_paragraphs["polarity_context"] = self.df_paragraphs.apply(
-            lambda row: [self._map_context_polarity(row, i, threshold) for i, x in enumerate(row["polarity"])], axis=1
-        )
+        polarity_context = np.where(party_distances <= threshold, polarity, 0)
+        self.df_paragraphs["polarity_context"] = self._split_lists(polarity_context, offsets)
 
-    def _map_context_polarity(self, row, index: int, threshold: int) -> float:
+    def _get_party_distances(self, tokens: TokenIds) -> Tuple[np.ndarray, Series]:
         """
-        Sets the polarity values to 0, if the distance between a party index and the current index is greater than
-        the specified threshold.
+        Determines for each token of all paragraphs the distance to the nearest party in the same paragraph.
 
-        :param row: Current row of the dataframe.
-        :param index: Current index of the polarity.
-        :param threshold: Max distance between current word and party index.
-
-        :return: Returns the original polarity if the index is in range of a party index, 0 otherwise.
+        :param tokens: Token ids of the text of all paragraphs.
+        :return: Tuple of the distances of the flattened tokens (infinite if a paragraph contains no party) and the
+        series containing the indices of the parties in each paragraph.
         """
-        for party_index in row["party_indices"]:
-            if abs(party_index - index) <= threshold:
-                return row["polarity"][index]
+        offsets = tokens.offsets
+        rows = tokens.rows()
+        positions = np.arange(len(tokens.ids))
+
+        # The text may already contain the parties without umlauts
+        parties = set(self.parties) | {self._remove_umlauts(party) for party in self.parties}
+        party_positions = np.flatnonzero(tokens.vocabulary.map_terms(lambda term: term in parties, bool)[tokens.ids])
+        party_rows = rows[party_positions]
+
+        # Find the previous and the next party of each token, they only count if they are in the same paragraph
+        next_party = np.searchsorted(party_positions, positions)
+        previous_party = next_party - 1
+
+        # Tokens without a previous or next party point to an appended party that is in no paragraph
+        party_positions = np.append(party_positions, 0)
+        party_rows = np.append(party_rows, -1)
+
+        next_distance = np.where(party_rows[next_party] == rows, party_positions[next_party] - positions, np.inf)
+        previous_distance = np.where(
+            party_rows[previous_party] == rows, positions - party_positions[previous_party], np.inf
+        )
+
+        # Indices of the parties relative to the start of their paragraph
+        party_offsets = np.zeros(len(offsets), dtype=np.int64)
+        party_offsets[1:] = np.cumsum(np.bincount(party_rows[:-1], minlength=len(offsets) - 1))
+        party_indices = self._split_lists(party_positions[:-1] - offsets[party_rows[:-1]], party_offsets)
 
-        return 0
+        return np.minimum(previous_distance, next_distance), party_indices
 
     def map_sentiment(self, threshold: float = 9e-05, overwrite: bool = False) -> None:
         """
         Maps the polarity of SentiWs and TextBlob to "Positive", "Negative" or "Neutral" for all paragraphs.
-        If the context sentiment score is present in the dataframe, it is also mapped.
+        If the context sentiment score is present in the dataframe, it is also mapped. The sentiment is stored as
+        categorical column with the categories of SENTIMENT_LABELS.
 
         :param overwrite: If True, overwrites the current sentiment.
         """
-
-        if "sentiment" not in self.df_paragraphs or overwrite:
-            # Map sentiment score to "Positive", "Negative" or "Neutral"
-            self.df_paragraphs["sentiment"] = self.df_paragraphs["sentiment_score"].apply(
-                lambda score: self._map_sentiment(score, threshold)
-            )
-
-        if "sentiment_textblob" not in self.df_paragraphs or overwrite:
-            # Map sentiment score to "Positive", "Negative" or "Neutral"
-            self.df_paragraphs["sentiment_textblob"] = self.df_paragraphs["polarity_textblob"].apply(
-                lambda score: self._map_sentiment(score, threshold)
-            )
-
-        if (
-            "sentiment_context" not in self.df_paragraphs or overwrite
-        ) and "sentiment_score_context" in self.df_paragraphs:
-            # Map sentiment score to "Positive", "Negative" or "Neutral"
-            self.df_paragraphs["sentiment_context"] = self.df_paragraphs["sentiment_score_context"].apply(
-                lambda score: self._map_sentiment(score, threshold)
-            )
-
-    def _map_sentiment(self, score: str, threshold: float = 9e-05) -> str:
+        columns = [
+            ("sentiment", "sentiment_score"),
+            ("sentiment_textblob", "polarity_textblob"),
+            ("sentiment_context", "sentiment_score_context"),
+        ]
+
+        for sentiment_column, score_column in columns:
+            if score_column not in self.df_paragraphs:
+                continue
+
+            if (
+                sentiment_column not in self.df_paragraphs
+                or self.df_paragraphs[sentiment_column].isna().any()
+                or overwrite
+            ):
+                # Map sentiment score to "Positive", "Negative" or "Neutral"
+                sentiment = self._map_scores(self.df_paragraphs[score_column].to_numpy(dtype=np.float64), threshold)
+            else:
+                # Sentiment that was stored as text
+                sentiment = pd.Categorical(self.df_paragraphs[sentiment_column], categories=SENTIMENT_LABELS)
+
+            self.df_paragraphs[sentiment_column] = Series(sentiment, index=self.df_paragraphs.index)
+
+    def _map_scores(self, scores: np.ndarray, threshold: float = 9e-05) -> pd.Categorical:
         """
-        Helper function that maps the sentiment_score to "Positive", "Negative" or "Neutral".
+        Maps the sentiment scores of all paragraphs to "Positive", "Negative" or "Neutral" at once.
 
-        :param score: The calculated sentiment_score of a paragraph.
-        :return: "Positive", "Negative" or "Neutral" dependent of the score input.
+        :param scores: The calculated sentiment scores of the paragraphs.
+        :param threshold: Scores with an absolute value up to the threshold are neutral.
+        :return: Categorical containing the sentiment of each paragraph.
         """
-        score = float(score)
-
-        if score > threshold:
-            return "Positive"
-        elif score < -threshold:
-            return "Negative"
-        else:
-            return "Neutral"
+        codes = np.full(len(scores), SENTIMENT_LABELS.index("Neutral"), dtype=np.int8)
+        codes[scores > threshold] = SENTIMENT_LABELS.index("Positive")
+        codes[scores < -threshold] = SENTIMENT_LABELS.index("Negative")
+        return pd.Categorical.from_codes(codes, categories=SENTIMENT_LABELS)
 
     def _remove_umlauts(self, string: str) -> str:
         """
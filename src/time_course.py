@@ -1,39 +1,26 @@
 import datetime
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 from dateutil.relativedelta import relativedelta
 from pandas import DataFrame
+from scipy.sparse import csr_matrix
 
-
-def get_term_count_nouns(df_interval_paragraphs, term):
-    """
-    count nouns which are equal to the term provided in the given dataframe
-    :param df_interval_paragraphs: dataframe, containing only the entries in a given timeframe
-    :param term: term, that is searched for in the dataframe
-    :return: number of found nouns, divided by the lenght of the given paragraph
-    """
-    count = df_interval_paragraphs["nouns"].apply(lambda row: row.count(term)).sum()
-    if len(df_interval_paragraphs.index) == 0:
-        return count
-    return count / len(df_interval_paragraphs.index)
-
-
-def get_term_count_overall(df_interval_paragraphs, term):
-    """
-    count words which are equal to the term provided in the given dataframe
-    :param df_interval_paragraphs: dataframe, containing only the entries in a given timeframe
-    :param term: term, that is searched for in the dataframe
-    :return: number of found words, divided by the lenght of the given paragraph
-    """
-    count = df_interval_paragraphs["text"].apply(lambda row: row.count(term)).sum()
-    if len(df_interval_paragraphs.index) == 0:
-        return count
-    return count / len(df_interval_paragraphs.index)
+from utils.group_index import GroupIndex
+from utils.token_ids import TokenIds
 
 
 class TimeCourse:
-    def __init__(self):
+    def __init__(self, group_index: GroupIndex = None, column_path: Optional[str] = None):
+        """
+        :param group_index: index of the parties and media of all paragraphs, if None it is built when needed
+        :param column_path: directory of the stored columns the paragraphs were read from, token columns that are not
+        loaded are read from it
+        """
         self.df_paragraphs = None
+        self.group_index = group_index
+        self.column_path = column_path
 
     def set_paragraph(self, df_paragraph):
         self.df_paragraphs = df_paragraph
@@ -59,33 +46,28 @@ class TimeCourse:
         :return: dataframes containing the data to plot the time course
         """
         self.df_paragraphs = df_paragraph
-        df_image = pd.DataFrame(columns=["party", "media", "term", "weight"])
+        months = self.get_months(initial_start_date, initial_end_date)
+
+        # use only top 3 words for each party, the counts of all terms are calculated at once
+        party_terms = {party: df_top_terms[df_top_terms["party"] == party]["term"].tolist() for party in party_list}
+        terms = list(dict.fromkeys(term for party in party_list for term in party_terms[party]))
+        media_masks = GroupIndex.of(df_paragraph, self.group_index).group_masks([], media_list)
+        weights = self.get_month_weights(df_paragraph, "nouns", media_masks, terms, months, self.column_path)
+
+        rows = []
         for party in party_list:
-            for media in media_list:
-                # use only top 3 words for each party
-                df_party_term = df_top_terms[df_top_terms["party"] == party]
-                for term in df_party_term["term"]:
-                    # split time window into smaller chunks
-                    # calculate months between dates
-                    start_date = initial_start_date
-                    next_end_date = initial_start_date + relativedelta(months=+1)
-                    weight_list = []
-                    dates = []
-                    while next_end_date < initial_end_date:
-                        # get weight for each month
-                        df_interval_paragraphs = self.configure_dataframe_for_time_course(
-                            start_date, next_end_date, media, df_paragraph
-                        )
-                        weight = get_term_count_nouns(df_interval_paragraphs, term)
-                        dates.append(start_date)
-                        weight_list.append(weight)
-                        start_date = next_end_date
-                        next_end_date = start_date + relativedelta(months=+1)
-                    df_image = df_image.append(
-                        {"party": party, "media": media, "term": term, "weight": weight_list, "dates": dates},
-                        ignore_index=True,
+            for media_index, media in enumerate(media_list):
+                for term in party_terms[party]:
+                    rows.append(
+                        {
+                            "party": party,
+                            "media": media,
+                            "term": term,
+                            "weight": weights[media_index, :, terms.index(term)].tolist(),
+                            "dates": months[:-1],
+                        }
                     )
-        return df_image
+        return pd.DataFrame(rows, columns=["party", "media", "term", "weight", "dates"])
 
     def get_time_course_custom_word(
         self,
@@ -107,75 +89,94 @@ class TimeCourse:
         :param df_paragraphs: dataframe containing the text
         :return: dataframes containing the data to plot the time course
         """
-        df_image = pd.DataFrame(columns=["filter_criteria", "word", "weight", "dates"])
-        for filter_criteria in filter_list:
-            if filter_criteria_word == "media":
-                df_term = df_paragraphs[df_paragraphs["media"] == filter_criteria]
-            else:
-                df_term = df_paragraphs[df_paragraphs.apply(lambda row: filter_criteria in row["parties"], axis=1)]
-            start_date = initial_start_date
-            next_end_date = initial_start_date + relativedelta(months=+1)
-            weight_list = []
-            dates = []
-            while next_end_date < initial_end_date:
-                df_interval_paragraphs = self.configure_dataframe_for_custom_time_course(
-                    start_date, next_end_date, filter_criteria_word, filter_criteria, df_term
-                )
-                weight = get_term_count_overall(df_interval_paragraphs, word)
-                weight_list.append(weight)
-                dates.append(start_date)
-                start_date = next_end_date
-                next_end_date = start_date + relativedelta(months=+1)
-            df_image = df_image.append(
-                {"filter_criteria": filter_criteria, "word": word, "weight": weight_list, "dates": dates},
-                ignore_index=True,
+        months = self.get_months(initial_start_date, initial_end_date)
+        group_index = GroupIndex.of(df_paragraphs, self.group_index)
+        if filter_criteria_word == "media":
+            masks = group_index.group_masks([], filter_list)
+        else:
+            masks = group_index.group_masks(filter_list, [])
+        weights = self.get_month_weights(df_paragraphs, "text", masks, [word], months, self.column_path)
+
+        rows = []
+        for filter_index, filter_criteria in enumerate(filter_list):
+            rows.append(
+                {
+                    "filter_criteria": filter_criteria,
+                    "word": word,
+                    "weight": weights[filter_index, :, 0].tolist(),
+                    "dates": months[:-1],
+                }
             )
-        return df_image
+        return pd.DataFrame(rows, columns=["filter_criteria", "word", "weight", "dates"])
 
-    def configure_dataframe_for_custom_time_course(
-        self, start_date, end_date, filter_criteria_word, filter_criteria, df
-    ):
+    @staticmethod
+    def get_months(initial_start_date: datetime, initial_end_date: datetime) -> List[datetime.datetime]:
         """
-        configure the dataframe for each month that needs to be calculated
-        :param start_date: start date of interval timeframe
-        :param end_date: end date of interval timeframe
-        :param filter_criteria_word: specify whether it is filtered by media outlet or by party
-        :param filter_criteria:
-        :param df: dataframe where operations shouldbe performed on
-        :return: dataframe containing only the determined time intervall
+        split the time window into months, the last month has to end before the end date
+        :param initial_start_date: start date where time should should be calculated
+        :param initial_end_date: end date where time should should be calculated
+        :return: start dates of the months followed by the end date of the last month
         """
-        df_paragraphs_time_interval = df[df["date"].notna()]
-        if filter_criteria_word == "media":
-            df_paragraphs_time_interval = df_paragraphs_time_interval[
-                df_paragraphs_time_interval["media"] == filter_criteria
-            ]
-        else:
-            df_paragraphs_time_interval = df_paragraphs_time_interval[
-                df_paragraphs_time_interval.apply(lambda row: filter_criteria in row["parties"], axis=1)
-            ]
-        if start_date and end_date:
-            start = start_date.strftime("%Y-%m-%d")
-            end = end_date.strftime("%Y-%m-%d")
-            df_paragraphs_time_interval = df_paragraphs_time_interval[
-                (df_paragraphs_time_interval["date"] > start) & (df_paragraphs_time_interval["date"] < end)
-            ]
-        return df_paragraphs_time_interval
-
-    def configure_dataframe_for_time_course(self, start_date, end_date, media, df):
+        months = [initial_start_date]
+        next_end_date = initial_start_date + relativedelta(months=+1)
+        while next_end_date < initial_end_date:
+            months.append(next_end_date)
+            next_end_date = next_end_date + relativedelta(months=+1)
+        return months
+
+    @staticmethod
+    def get_month_weights(
+        df: DataFrame,
+        column: str,
+        group_masks: np.ndarray,
+        terms: List[str],
+        months: List[datetime.datetime],
+        column_path: Optional[str] = None,
+    ) -> np.ndarray:
         """
-        configure the dataframe for each month that needs to be calculated
-        :param start_date: start date of interval timeframe
-        :param end_date: end date of interval timeframe
-        :param media: determines
-        :param df: dataframe, where the operation is performed on
-        :return: dataframe containing only the determined time intervall
+        calculate the occurrences of terms divided by the number of paragraphs for each group and month. The paragraphs
+        are bucketed by month once and all counts are the product of a sparse (group, month) indicator matrix with the
+        term counts of the paragraphs. A month contains the paragraphs dated after its start date and before its end
+        date, paragraphs without a date are in no month
+        :param df: dataframe containing the paragraphs
+        :param column: column containing the tokens of each paragraph, e.g. nouns
+        :param group_masks: boolean array with a row for each group that is True for the paragraphs of the group
+        :param terms: terms to count
+        :param months: start dates of the months followed by the end date of the last month (see get_months)
+        :param column_path: directory of the stored columns the dataframe was read from, if the column is not loaded
+        :return: array of the weights with the axes group, month and term
         """
-        df_paragraphs_time_interval = df[df["date"].notna()]
-        df_paragraphs_time_interval = df_paragraphs_time_interval[df_paragraphs_time_interval["media"] == media]
-        if start_date and end_date:
-            start = start_date.strftime("%Y-%m-%d")
-            end = end_date.strftime("%Y-%m-%d")
-            df_paragraphs_time_interval = df_paragraphs_time_interval[
-                (df_paragraphs_time_interval["date"] > start) & (df_paragraphs_time_interval["date"] < end)
-            ]
-        return df_paragraphs_time_interval
+        number_of_groups = len(group_masks)
+        number_of_months = len(months) - 1
+
+        # get the month of each paragraph (-1 if it is in no month)
+        dates = df["date"].to_numpy(dtype=object)
+        dated = np.flatnonzero(df["date"].notna().to_numpy())
+        bounds = np.array([month.strftime("%Y-%m-%d") for month in months], dtype=object)
+        periods = np.full(len(df), -1, dtype=np.int64)
+        if number_of_months > 0 and len(dated) > 0:
+            period = np.searchsorted(bounds, dates[dated], side="right") - 1
+            in_month = (period >= 0) & (period < number_of_months)
+            in_month[in_month] = dates[dated][in_month] != bounds[period[in_month]]
+            periods[dated[in_month]] = period[in_month]
+
+        # bucket the paragraphs of each group by month
+        group_rows, paragraph_rows = np.nonzero(group_masks & (periods >= 0))
+        buckets = group_rows * number_of_months + periods[paragraph_rows]
+        indicator = csr_matrix(
+            (np.ones(len(buckets)), (buckets, paragraph_rows)), shape=(number_of_groups * number_of_months, len(df))
+        )
+
+        # count only the tokens of the terms
+        tokens = TokenIds.from_dataframe(df, column, column_path)
+        term_ids = np.array([tokens.vocabulary.ids.get(term, -1) for term in terms], dtype=np.int64)
+        known_terms = term_ids >= 0
+        mask = np.zeros(len(tokens.vocabulary), dtype=bool)
+        mask[term_ids[known_terms]] = True
+
+        counts = np.zeros((number_of_groups * number_of_months, len(terms)))
+        counts[:, known_terms] = (indicator @ tokens.count_matrix(mask=mask)[:, term_ids[known_terms]]).toarray()
+        sizes = np.bincount(buckets, minlength=number_of_groups * number_of_months)
+
+        weights = counts / np.maximum(sizes, 1)[:, np.newaxis]
+        return weights.reshape(number_of_groups, number_of_months, len(terms))
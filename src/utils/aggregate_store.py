@@ -0,0 +1,321 @@
+import hashlib
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from utils.aggregation_cube import AggregationCube
+from utils.group_index import GroupIndex
+from utils.reader import Reader
+from utils.sentiment_metrics import SENTIMENT_LABELS, SentimentMetrics
+from utils.writer import Writer
+
+
+class AggregateStore:
+    """
+    Class that stores the number of paragraphs by party, media outlet, day, sentiment method and sentiment on disk. The
+    GUI answers statistics, sentiment and date filter queries from these aggregates without the paragraphs. The aggregates are updated incrementally: only paragraphs of articles that were
+    not aggregated yet are added, they are rebuilt if aggregated articles were removed or their sentiment changed.
+    """
+
+    # Label of the party slot that counts every paragraph once, independent of its parties
+    all_parties = "*"
+
+    # Sentiment methods with the column of their sentiment and the column of their score (part of the fingerprints)
+    methods = [
+        ("sentiment", "sentiment_score"),
+        ("sentiment_textblob", "polarity_textblob"),
+        ("sentiment_context", "sentiment_score_context"),
+    ]
+
+    key_columns = ["party", "media", "date", "method", "sentiment"]
+
+    def __init__(self, aggregates: DataFrame, article_hashes: List[str], fingerprints: Optional[List[str]] = None):
+        """
+        :param aggregates: The count for each combination of the key columns.
+        :param article_hashes: The hashes of the aggregated articles.
+        :param fingerprints: The fingerprint of the sentiment of each aggregated article (see get_fingerprints).
+        """
+        self.aggregates = aggregates
+        self.article_hashes = article_hashes
+        self.fingerprints = fingerprints
+
+    @staticmethod
+    def read(filename: str = "aggregates") -> Optional["AggregateStore"]:
+        """
+        Reads the stored aggregates.
+
+        :param filename: the name of the directory of the aggregates inside "src/output".
+        :return: The stored aggregates, None if there are no stored aggregates.
+        """
+        path = "src/output/" + filename
+        hashes_path = path + "_hashes.json"
+
+        if not os.path.isdir(path) or not os.path.exists(hashes_path):
+            return None
+
+        df_hashes = Reader.read_json_to_df_default(hashes_path)
+        article_hashes = df_hashes["article_hash"].tolist() if "article_hash" in df_hashes else []
+        fingerprints = df_hashes["fingerprint"].astype(str).tolist() if "fingerprint" in df_hashes else None
+        return AggregateStore(Reader.read_columns(path), article_hashes, fingerprints)
+
+    def write(self, filename: str = "aggregates") -> None:
+        """
+        Stores the aggregates in the columnar format of Writer.write_columns and the hashes of the aggregated articles
+        next to them.
+
+        :param filename: the name of the directory of the aggregates inside "src/output".
+        """
+        Writer.write_columns(self.aggregates, filename)
+        df_hashes = DataFrame({"article_hash": self.article_hashes})
+
+        if self.fingerprints is not None:
+            df_hashes["fingerprint"] = self.fingerprints
+
+        Writer.write_dataframe(df_hashes, filename + "_hashes")
+
+    @staticmethod
+    def update(df_paragraphs: DataFrame, overwrite: bool = False, filename: str = "aggregates") -> "AggregateStore":
+        """
+        Updates the stored aggregates with the paragraphs of new articles and stores them again. The aggregates are
+        rebuilt if they do not exist, if aggregated articles are missing in the paragraphs, if the sentiment of
+        aggregated articles changed (e.g. because the scores of all paragraphs were recalculated) or if the paragraphs
+        have no article hashes.
+
+        :param df_paragraphs: the paragraphs with their sentiment.
+        :param overwrite: If True, the aggregates are rebuilt from all paragraphs.
+        :param filename: the name of the directory of the aggregates inside "src/output".
+        :return: The updated aggregates.
+        """
+        if "article_hash" not in df_paragraphs:
+            store = AggregateStore(AggregateStore.aggregate(df_paragraphs), [])
+            store.write(filename)
+            return store
+
+        store = None if overwrite else AggregateStore.read(filename)
+        fingerprints = AggregateStore.get_fingerprints(df_paragraphs)
+
+        if store is None or not AggregateStore._is_unchanged(store, fingerprints):
+            store = AggregateStore(
+                AggregateStore.aggregate(df_paragraphs), fingerprints.index.tolist(), fingerprints.tolist()
+            )
+        else:
+            # Only aggregate the paragraphs of articles that were not aggregated yet
+            new_paragraphs = ~df_paragraphs["article_hash"].isin(store.article_hashes).to_numpy()
+
+            if not new_paragraphs.any():
+                return store
+
+            df_new_paragraphs = df_paragraphs[new_paragraphs]
+            new_fingerprints = fingerprints.drop(store.article_hashes)
+            store.add(
+                AggregateStore.aggregate(df_new_paragraphs), new_fingerprints.index.tolist(), new_fingerprints.tolist()
+            )
+
+        store.write(filename)
+        return store
+
+    @staticmethod
+    def get_fingerprints(df_paragraphs: DataFrame) -> pd.Series:
+        """
+        Get a fingerprint of the sentiments and scores of the paragraphs of each article. The fingerprint of an article
+        is the sum of the hashes of its paragraphs, so it does not depend on the order of the paragraphs.
+
+        :param df_paragraphs: the paragraphs with the column "article_hash" and their sentiment.
+        :return: Series of the fingerprints (hex strings) with the article hashes as index.
+        """
+        codes, article_hashes = pd.factorize(df_paragraphs["article_hash"])
+        values = {}
+
+        for method, score_column in AggregateStore.methods:
+            if method in df_paragraphs:
+                values[method] = SentimentMetrics.encode(df_paragraphs[method])
+
+            if score_column in df_paragraphs:
+                scores = pd.to_numeric(df_paragraphs[score_column], errors="coerce")
+                values[score_column] = scores.to_numpy(dtype=np.float64)
+
+        if values:
+            row_hashes = pd.util.hash_pandas_object(DataFrame(values), index=False).to_numpy(dtype=np.uint64)
+        else:
+            row_hashes = np.zeros(len(df_paragraphs), dtype=np.uint64)
+
+        # The names of the columns are part of the hash, so adding or removing a sentiment method changes it
+        row_hashes = row_hashes ^ np.uint64(int(hashlib.sha1(",".join(values).encode()).hexdigest()[:16], 16))
+
+        # uint64 sums wrap around, which keeps the sum a valid hash
+        sums = np.zeros(len(article_hashes), dtype=np.uint64)
+        np.add.at(sums, codes[codes >= 0], row_hashes[codes >= 0])
+
+        return pd.Series(["{:016x}".format(value) for value in sums.tolist()], index=list(article_hashes), dtype=object)
+
+    @staticmethod
+    def _is_unchanged(store: "AggregateStore", fingerprints: pd.Series) -> bool:
+        """
+        Checks if the aggregated articles can be kept: all of them still exist and their sentiment did not change.
+
+        :param store: The stored aggregates.
+        :param fingerprints: The fingerprints of the articles of the current paragraphs.
+        :return: True if only the paragraphs of new articles have to be aggregated.
+        """
+        if store.fingerprints is None or len(store.fingerprints) != len(store.article_hashes):
+            return False
+
+        if not set(store.article_hashes) <= set(fingerprints.index):
+            return False
+
+        return fingerprints.loc[store.article_hashes].tolist() == store.fingerprints
+
+    @staticmethod
+    def aggregate(df_paragraphs: DataFrame) -> DataFrame:
+        """
+        Aggregates paragraphs by party, media outlet, day, sentiment method and sentiment. Paragraphs about several
+        parties are counted for each of their parties and every paragraph is counted once for all_parties.
+
+        :param df_paragraphs: the paragraphs with the columns "parties" and "media" and their sentiment.
+        :return: Dataframe with the key columns and the number of paragraphs ("count").
+        """
+        group_index = GroupIndex.from_dataframe(df_paragraphs)
+
+        # Expand the rows to one entry per party, plus one entry per row for all paragraphs
+        rows, party_codes = group_index.party_rows()
+        rows = np.concatenate([rows, np.arange(len(df_paragraphs))])
+        party_names = np.array(list(group_index.parties) + [AggregateStore.all_parties], dtype=object)
+        parties = party_names[np.concatenate([party_codes, np.full(len(df_paragraphs), len(group_index.parties))])]
+
+        media = np.asarray(group_index.media, dtype=object)[rows]
+
+        if "date" in df_paragraphs:
+            dates = df_paragraphs["date"].astype("string").str[:10].to_numpy(dtype=object, na_value=None)[rows]
+        else:
+            dates = np.full(len(rows), None, dtype=object)
+
+        entries = []
+
+        for method, _ in AggregateStore.methods:
+            if method not in df_paragraphs:
+                continue
+
+            sentiment = df_paragraphs[method].astype(object).to_numpy()[rows]
+
+            entries.append(
+                DataFrame(
+                    {
+                        "party": parties,
+                        "media": media,
+                        "date": dates,
+                        "method": method,
+                        "sentiment": sentiment,
+                    }
+                )
+            )
+
+        if not entries:
+            return DataFrame(columns=AggregateStore.key_columns + ["count"])
+
+        return AggregateStore._sum(pd.concat(entries, ignore_index=True).assign(count=1))
+
+    def add(self, aggregates: DataFrame, article_hashes: List[str], fingerprints: Optional[List[str]] = None) -> None:
+        """
+        Adds the aggregates of new articles.
+
+        :param aggregates: The aggregates of the paragraphs of the new articles.
+        :param article_hashes: The hashes of the new articles.
+        :param fingerprints: The fingerprints of the new articles, if None the stored fingerprints are dropped.
+        """
+        self.aggregates = AggregateStore._sum(pd.concat([self.aggregates, aggregates], ignore_index=True))
+        self.article_hashes = self.article_hashes + article_hashes
+
+        if self.fingerprints is not None and fingerprints is not None:
+            self.fingerprints = self.fingerprints + fingerprints
+        else:
+            self.fingerprints = None
+
+    def get_cube(
+        self, method: str = "sentiment", min_date: Optional[str] = None, max_date: Optional[str] = None
+    ) -> AggregationCube:
+        """
+        Get the counts of the paragraphs by party, media outlet, sentiment and month from the aggregates.
+
+        :param method: The sentiment method of the sentiment axis.
+        :param min_date: If set, only paragraphs with a date after this day (YYYY-MM-DD) are counted.
+        :param max_date: If set, only paragraphs with a date before this day (YYYY-MM-DD) are counted.
+        :return: The counts of the paragraphs.
+        """
+        aggregates = self._filter(method, min_date, max_date)
+        parties = sorted(set(aggregates["party"].dropna()) - {AggregateStore.all_parties})
+        media = sorted(aggregates["media"].dropna().unique())
+        months = sorted(aggregates["date"].astype("string").str[:7].dropna().unique())
+
+        # Unknown values (code -1) are counted in the last slot of their axis, like in AggregationCube
+        codes = []
+
+        for values, categories in [
+            (aggregates["party"], parties + [AggregateStore.all_parties]),
+            (aggregates["media"], media),
+            (aggregates["sentiment"], SENTIMENT_LABELS),
+            (aggregates["date"].astype("string").str[:7], months),
+        ]:
+            value_codes = pd.Categorical(values, categories=categories).codes.astype(np.int64)
+            codes.append(np.where(value_codes < 0, len(categories), value_codes))
+
+        shape = (len(parties) + 1, len(media) + 1, len(SENTIMENT_LABELS) + 1, len(months) + 1)
+        counts = np.zeros(shape, dtype=np.int64)
+        np.add.at(counts, tuple(codes), aggregates["count"].to_numpy(dtype=np.int64))
+
+        return AggregationCube(counts, parties, media, months)
+
+    def get_date_range(self, min_date: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Get the first and the last day of the aggregated paragraphs with a date.
+
+        :param min_date: If set, only days after this day (YYYY-MM-DD) are considered.
+        :return: Tuple of the first and the last day, (None, None) if there is no such paragraph.
+        """
+        dates = self.aggregates["date"].dropna().astype(str)
+
+        if min_date:
+            dates = dates[dates > min_date]
+
+        if len(dates) == 0:
+            return None, None
+
+        return dates.min(), dates.max()
+
+    def _filter(self, method: str, min_date: Optional[str], max_date: Optional[str]) -> DataFrame:
+        """
+        Get the aggregates of a sentiment method within a time span. Like SentimentGUI.filter_time, paragraphs without
+        a date are removed if any bound is set.
+
+        :param method: The sentiment method.
+        :param min_date: If set, only paragraphs with a date after this day (YYYY-MM-DD) are kept.
+        :param max_date: If set, only paragraphs with a date before this day (YYYY-MM-DD) are kept.
+        :return: The filtered aggregates.
+        """
+        aggregates = self.aggregates[self.aggregates["method"] == method]
+
+        if min_date or max_date:
+            aggregates = aggregates[aggregates["date"].notna()]
+
+        if min_date:
+            aggregates = aggregates[aggregates["date"] > min_date]
+
+        if max_date:
+            aggregates = aggregates[aggregates["date"] < max_date]
+
+        return aggregates
+
+    @staticmethod
+    def _sum(entries: DataFrame) -> DataFrame:
+        """
+        Sums the counts of entries with the same key columns.
+
+        :param entries: Dataframe with the key columns and "count".
+        :return: Dataframe with one row for each combination of the key columns.
+        """
+        # Missing keys (e.g. paragraphs without a date) are kept as their own group
+        sums = entries.groupby(AggregateStore.key_columns, dropna=False)[["count"]].sum().reset_index()
+        sums["count"] = sums["count"].astype(np.int64)
+        return sums
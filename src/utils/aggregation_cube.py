@@ -0,0 +1,129 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from utils.group_index import GroupIndex
+from utils.sentiment_metrics import SENTIMENT_LABELS, SentimentMetrics
+
+
+class AggregationCube:
+    """
+    Class that counts the paragraphs by party, media outlet, sentiment and month in one pass, so statistics of any
+    combination of them are sliced from the counts instead of filtering the paragraphs. Paragraphs about several parties
+    are counted for each of their parties, the last party slot counts every paragraph once. Unknown media, sentiments
+    and months are counted in the last slot of their axis.
+    """
+
+    def __init__(self, counts: np.ndarray, parties: List[str], media: List[str], months: List[str]):
+        """
+        :param counts: The counts with the axes party, media outlet, sentiment (in the order of SENTIMENT_LABELS) and
+        month.
+        :param parties: The parties of the party axis.
+        :param media: The media outlets of the media axis.
+        :param months: The months (YYYY-MM) of the month axis.
+        """
+        self.counts = counts
+        self.parties = parties
+        self.media = media
+        self.months = months
+
+    @staticmethod
+    def from_dataframe(dataframe: DataFrame, group_index: Optional[GroupIndex] = None) -> "AggregationCube":
+        """
+        Counts the paragraphs of a dataframe. The parties of all rows are expanded from their bitmaps at once and all
+        counts are calculated with a single bincount.
+
+        :param dataframe: Dataframe with the columns "parties" and "media" and optionally "sentiment" and "date".
+        :param group_index: Index of the parties and media of all paragraphs. If None, it is built from the dataframe.
+        :return: The counts of the paragraphs.
+        """
+        group_index = GroupIndex.of(dataframe, group_index)
+        parties = list(group_index.parties)
+        media = list(group_index.media.categories)
+
+        if "date" in dataframe:
+            months = pd.Categorical(dataframe["date"].astype("string").str[:7].to_numpy())
+        else:
+            months = pd.Categorical([None] * len(dataframe))
+
+        if "sentiment" in dataframe:
+            sentiment_codes = SentimentMetrics.encode(dataframe["sentiment"])
+        else:
+            sentiment_codes = np.full(len(dataframe), -1, dtype=np.int64)
+
+        shape = (len(parties) + 1, len(media) + 1, len(SENTIMENT_LABELS) + 1, len(months.categories) + 1)
+
+        # Unknown values (code -1) are counted in the last slot of their axis
+        media_codes = np.where(group_index.media.codes < 0, len(media), group_index.media.codes)
+        sentiment_codes = np.where(sentiment_codes < 0, len(SENTIMENT_LABELS), sentiment_codes)
+        month_codes = np.where(months.codes < 0, len(months.categories), months.codes)
+
+        # Expand the party bitmaps to one entry per row and party, plus one entry per row for all paragraphs
+        rows, party_codes = group_index.party_rows()
+        rows = np.concatenate([rows, np.arange(len(dataframe))])
+        party_codes = np.concatenate([party_codes, np.full(len(dataframe), len(parties))])
+
+        keys = np.ravel_multi_index((party_codes, media_codes[rows], sentiment_codes[rows], month_codes[rows]), shape)
+        counts = np.bincount(keys, minlength=int(np.prod(shape))).reshape(shape)
+
+        return AggregationCube(counts, parties, media, list(months.categories))
+
+    @staticmethod
+    def of(dataframe: DataFrame, cube: Optional["AggregationCube"] = None) -> "AggregationCube":
+        """
+        Get the counts of the paragraphs of a dataframe.
+
+        :param dataframe: The dataframe of the paragraphs.
+        :param cube: Counts that were already calculated for the dataframe, if None they are calculated.
+        :return: The counts of the paragraphs.
+        """
+        return AggregationCube.from_dataframe(dataframe) if cube is None else cube
+
+    def count(
+        self, party: Optional[str] = None, media: Optional[str] = None, months: Optional[List[str]] = None
+    ) -> int:
+        """
+        Get the number of paragraphs of a party and media outlet.
+
+        :param party: The party. If None, paragraphs of all (and no) parties are counted.
+        :param media: The media outlet. If None, paragraphs of all media are counted.
+        :param months: The months (YYYY-MM) to count. If None, all paragraphs are counted.
+        :return: The number of paragraphs.
+        """
+        return int(self._slice(party, media, months).sum())
+
+    def sentiment_counts(
+        self, party: Optional[str] = None, media: Optional[str] = None, months: Optional[List[str]] = None
+    ) -> Tuple[int, int, int]:
+        """
+        Get the number of positive, negative and neutral paragraphs of a party and media outlet.
+
+        :param party: The party. If None, paragraphs of all (and no) parties are counted.
+        :param media: The media outlet. If None, paragraphs of all media are counted.
+        :param months: The months (YYYY-MM) to count. If None, all paragraphs are counted.
+        :return: Tuple of the number of positive, negative and neutral paragraphs.
+        """
+        positive, negative, neutral = self._slice(party, media, months).sum(axis=1)[: len(SENTIMENT_LABELS)].tolist()
+        return positive, negative, neutral
+
+    def _slice(self, party: Optional[str], media: Optional[str], months: Optional[List[str]]) -> np.ndarray:
+        """
+        Get the counts of a party and media outlet by sentiment and month.
+
+        :param party: The party. If None, paragraphs of all (and no) parties are selected.
+        :param media: The media outlet. If None, paragraphs of all media are selected.
+        :param months: The months (YYYY-MM) to select. If None, all months are selected.
+        :return: Array of the counts with the axes sentiment and month.
+        """
+        if (party is not None and party not in self.parties) or (media is not None and media not in self.media):
+            return np.zeros(self.counts.shape[2:], dtype=self.counts.dtype)
+
+        party_counts = self.counts[len(self.parties) if party is None else self.parties.index(party)]
+        counts = party_counts.sum(axis=0) if media is None else party_counts[self.media.index(media)]
+
+        if months is not None:
+            counts = counts[:, [self.months.index(month) for month in months if month in self.months]]
+
+        return counts
@@ -1,7 +1,79 @@
-from argparse import ArgumentParser
+from argparse import ArgumentParser, ArgumentTypeError
+from typing import List, Optional, Tuple
 
 
-def parse_arguments():
+def processes(value: str) -> int:
+    """
+    Parses a number of processes.
+
+    :param value: The number of processes, -1 for all cores.
+    :return: The number of processes.
+    """
+    number = int(value)
+
+    if number != -1 and number < 1:
+        raise ArgumentTypeError("number of processes has to be -1 (all cores) or at least 1, got {}".format(value))
+
+    return number
+
+
+def window_range(value: str) -> Tuple[int, int]:
+    """
+    Parses a range of window sizes, a single window size N is the range N-N.
+
+    :param value: The range <start>-<end> or a single window size.
+    :return: Tuple of the first and the last window size.
+    """
+    bounds = value.split("-")
+
+    if len(bounds) not in (1, 2) or not all(bound.strip().isdigit() for bound in bounds):
+        raise ArgumentTypeError("window range has to be <start>-<end> or a single window size, got {}".format(value))
+
+    start, end = int(bounds[0]), int(bounds[-1])
+
+    if start > end:
+        raise ArgumentTypeError("window range {} is empty, the start has to be at most the end".format(value))
+
+    return start, end
+
+
+def positive_int(value: str) -> int:
+    """
+    Parses a positive integer.
+
+    :param value: The integer.
+    :return: The integer.
+    """
+    number = int(value)
+
+    if number < 1:
+        raise ArgumentTypeError("has to be at least 1, got {}".format(value))
+
+    return number
+
+
+def positive_float(value: str) -> float:
+    """
+    Parses a positive number.
+
+    :param value: The number.
+    :return: The number.
+    """
+    number = float(value)
+
+    if not number > 0:
+        raise ArgumentTypeError("has to be greater than 0, got {}".format(value))
+
+    return number
+
+
+def parse_arguments(args: Optional[List[str]] = None):
+    """
+    Parses the command line arguments.
+
+    :param args: The arguments to parse. If None, the arguments of the command line are parsed.
+    :return: The parsed arguments.
+    """
     parser = ArgumentParser()
     parser.add_argument("-g", "--gui", dest="show_gui", action="store_true", help="show GUI", default=False)
     parser.add_argument(
@@ -17,6 +89,40 @@ def parse_arguments():
         default=None,
     )
 
+    parser.add_argument(
+        "--stratified",
+        dest="stratified",
+        action="store_true",
+        help="sample the articles in proportion to the number of articles of each media",
+        default=False,
+    )
+
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        dest="batch_size",
+        help="number of paragraphs that are parsed together by spacy",
+        type=int,
+        default=1000,
+    )
+
+    parser.add_argument(
+        "-p",
+        "--processes",
+        dest="processes",
+        help="number of processes used for parsing and training (-1 uses all cores)",
+        type=processes,
+        default=1,
+    )
+
+    parser.add_argument(
+        "--prefilter-recall",
+        dest="prefilter_recall",
+        help="evaluate the party pre-filter against the NER based filter on the given number of paragraphs",
+        type=int,
+        default=None,
+    )
+
     parser.add_argument("-l", "--lableling", dest="labeling", help="Label preprocessed data", default=None)
 
     parser.add_argument(
@@ -28,8 +134,40 @@ def parse_arguments():
         default=False,
     )
 
+    parser.add_argument(
+        "--windows",
+        dest="windows",
+        help="range of window sizes <start>-<end> (or a single window size) searched for the context sentiment",
+        type=window_range,
+        default="0-35",
+    )
+
+    parser.add_argument(
+        "--window-step",
+        dest="window_step",
+        help="distance between the searched window sizes",
+        type=positive_int,
+        default=1,
+    )
+
+    parser.add_argument(
+        "--max-score-threshold",
+        dest="max_score_threshold",
+        help="biggest score threshold searched for the context sentiment",
+        type=positive_float,
+        default=0.001,
+    )
+
+    parser.add_argument(
+        "--score-step",
+        dest="score_step",
+        help="distance between the searched score thresholds (all thresholds where the sentiment changes if not set)",
+        type=positive_float,
+        default=None,
+    )
+
     parser.add_argument(
         "-c", "--compare", dest="compare", action="store_true", help="compare results with labeled data", default=False
     )
 
-    return parser.parse_args()
+    return parser.parse_args(args)
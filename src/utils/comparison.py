@@ -1,13 +1,14 @@
-from typing import List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from pandas import Series
-from sklearn import metrics
 
 from tfidf_sentiment import TfidfSentiment
 from utils.reader import Reader
+from utils.sentiment_metrics import SENTIMENT_LABELS, SentimentMetrics
 from utils.writer import Writer
 
 
@@ -16,102 +17,134 @@ class Comparison:
         self.dataframe = Reader.read_json_to_df_default(path)
         self.tfidf_sentiment = TfidfSentiment(self.dataframe)
 
-    def train_threshold(self) -> float:
+    def train_threshold(self, max_threshold: float = 0.005) -> float:
         """
-        Train the threshold with labeled data.
+        Train the threshold with labeled data. The labeled scores are sorted once, so the f1 scores of all thresholds
+        where the mapping of a paragraph changes are calculated exactly.
 
+        :param max_threshold: The biggest threshold to consider.
         :return The best threshold.
         """
-        threshold: float = 0
-        best_threshold: float = 0
-        best_score: float = 0
-
-        thresholds: List[float] = []
-        f1_scores: List[Tuple[float, float, float, float]] = []
-
         self.tfidf_sentiment.get_context_polarity(8)
         self.tfidf_sentiment.calculate_sentiment_score(overwrite=True)
 
-        # Iterate over different thresholds, increase with every loop
-        while threshold <= 0.005:
-            self.tfidf_sentiment.map_sentiment(threshold=threshold, overwrite=True)
-
-            # Optimize over the sum of all f1 scores for SentiWs
-            f1_sentiws, _, _ = self.f1_score(training=True)
-            f1_sum = f1_sentiws[0] + f1_sentiws[1] + f1_sentiws[2]
-
-            thresholds.append(threshold)
-            f1_scores.append((f1_sum, f1_sentiws[0], f1_sentiws[1], f1_sentiws[2]))
-
-            # Replace best threshold if current one is better
-            if f1_sum > best_score:
-                best_score = f1_sum
-                best_threshold = threshold
+        # Optimize over the sum of all f1 scores for SentiWs
+        thresholds, f1_scores = self.sweep_thresholds(
+            self.dataframe["sentiment_score"], self.dataframe["labeled_sentiment"], max_threshold
+        )
+        f1_sums = f1_scores.sum(axis=1)
 
-            threshold += 0.0000001
+        # The smallest threshold with the best score
+        best_threshold = float(thresholds[np.argmax(f1_sums)])
 
         # Visualize the training
-        self.visualize_threshold(thresholds, f1_scores, best_threshold, 0.005)
+        self.visualize_threshold(
+            thresholds.tolist(),
+            [(f1_sum, *f1_score) for f1_sum, f1_score in zip(f1_sums, f1_scores)],
+            best_threshold,
+            max_threshold,
+            steps=True,
+        )
 
         # Adjust the sentiment with best threshold
         self.tfidf_sentiment.map_sentiment(threshold=best_threshold, overwrite=True)
         Writer.write_dataframe(self.dataframe, "labeled_paragraphs")
         return best_threshold
 
-    def train_context_thresholds(self) -> Tuple[float, float]:
+    @staticmethod
+    def sweep_thresholds(
+        scores: Series, labeled_sentiment: Series, max_threshold: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Train the context threshold (SentiWs with context polarity) with labeled data.
+        Calculates the f1 scores of the sentiment mapping for every threshold up to max_threshold where the mapping of
+        a paragraph changes. A paragraph is mapped to "Neutral" as soon as the threshold reaches its absolute score, so
+        between two absolute scores the f1 scores do not change.
+
+        :param scores: The sentiment scores of the labeled paragraphs.
+        :param labeled_sentiment: The labeled sentiment of the paragraphs.
+        :param max_threshold: The biggest threshold to consider.
+        :return: Tuple of the sorted thresholds and the f1 scores for positive, negative and neutral labeled data for
+        each threshold.
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        labeled_codes = SentimentMetrics.encode(labeled_sentiment)
+
+        absolute_scores = np.abs(scores)
+        thresholds = np.unique(np.append(absolute_scores[absolute_scores <= max_threshold], 0))
+
+        # Confusion matrix for each threshold (labeled sentiment in rows, mapped sentiment in columns)
+        confusion = np.zeros((len(thresholds), len(SENTIMENT_LABELS), len(SENTIMENT_LABELS)), dtype=np.int64)
+
+        for label_code in range(len(SENTIMENT_LABELS)):
+            label_scores = scores[labeled_codes == label_code]
+            positive_scores = np.sort(label_scores[label_scores > 0])
+            negative_scores = np.sort(-label_scores[label_scores < 0])
 
+            # Count the scores above the threshold
+            confusion[:, label_code, 0] = len(positive_scores) - np.searchsorted(positive_scores, thresholds, "right")
+            confusion[:, label_code, 1] = len(negative_scores) - np.searchsorted(negative_scores, thresholds, "right")
+            confusion[:, label_code, 2] = len(label_scores) - confusion[:, label_code, :2].sum(axis=1)
+
+        f1_scores = SentimentMetrics(confusion).f1_score()
+        return thresholds, f1_scores
+
+    def train_context_thresholds(
+        self,
+        windows: range = range(0, 36),
+        max_score_threshold: float = 0.001,
+        score_step: Optional[float] = None,
+        processes: int = 1,
+    ) -> Tuple[int, float]:
+        """
+        Train the context threshold (SentiWs with context polarity) with labeled data. The window sizes are searched in
+        parallel, for each window size the score thresholds are searched with a sorted sweep.
+
+        :param windows: The window sizes to search.
+        :param max_score_threshold: The biggest score threshold to search.
+        :param score_step: The distance between the searched score thresholds. If None, all score thresholds where the
+        mapping of a paragraph changes are searched.
+        :param processes: Number of processes used for the search (-1 uses all cores).
         :return The best thresholds for window size and score.
         """
-        window_threshold: int = 0
+        if len(windows) == 0:
+            raise ValueError("At least one window size has to be searched")
+
+        if processes != -1 and processes < 1:
+            raise ValueError("The number of processes has to be -1 (all cores) or at least 1, got {}".format(processes))
+
+        if not max_score_threshold > 0 or (score_step is not None and not score_step > 0):
+            raise ValueError("The biggest score threshold and the score step have to be greater than 0")
+
         best_window_threshold: int = 0
         best_score_threshold: float = 0
         best_score: float = 0
 
-        thresholds: List[float] = []
         f1_scores: List[Tuple] = []
 
-        # Iterate over different window thresholds, increase with every loop
-        while window_threshold <= 35:
-            self.tfidf_sentiment.get_context_polarity(window_threshold)
-            self.tfidf_sentiment.calculate_sentiment_score(overwrite=True)
-
-            score_threshold: float = 0
-
-            # Save best temp scores for visualization
-            best_temp_score_f1_sum: float = 0
-            best_temp_score_f1_scores: Tuple = ()
-
-            # Iterate over different score thresholds, increase with every loop
-            while score_threshold < 0.001:
-                self.tfidf_sentiment.map_sentiment(overwrite=True, threshold=score_threshold)
-                self.dataframe = self.tfidf_sentiment.df_paragraphs
-
-                # Optimize over the sum of all f1 scores for context sentiment
-                _, _, f1_context = self.f1_score(training=True)
-                f1_sum = f1_context[0] + f1_context[1] + f1_context[2]
-
-                # Replace best temp thresholds for visualization if current ones are better
-                if f1_sum > best_temp_score_f1_sum:
-                    best_temp_score_f1_sum = f1_sum
-                    best_temp_score_f1_scores = (f1_sum, f1_context[0], f1_context[1], f1_context[2])
+        # Calculate the context scores of all window thresholds at once
+        context_scores = self.tfidf_sentiment.get_context_scores(max(windows))
+        labeled_sentiment = self.dataframe["labeled_sentiment"].to_numpy()
 
-                # Replace best thresholds if current ones are better
-                if f1_sum > best_score:
-                    best_score = f1_sum
-                    best_window_threshold = window_threshold
-                    best_score_threshold = score_threshold
+        tasks = [(context_scores[:, window], labeled_sentiment, max_score_threshold, score_step) for window in windows]
 
-                score_threshold += 0.00001
+        # Search the score thresholds of the windows in parallel
+        if processes == 1:
+            results = [Comparison._train_window(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=None if processes == -1 else processes) as executor:
+                results = list(executor.map(Comparison._train_window, tasks))
 
-            thresholds.append(window_threshold)
-            f1_scores.append(best_temp_score_f1_scores)
+        for window_threshold, (score_threshold, window_f1_scores) in zip(windows, results):
+            f1_scores.append(window_f1_scores)
 
-            window_threshold += 1
+            # Replace best thresholds if current ones are better
+            if window_f1_scores[0] > best_score:
+                best_score = window_f1_scores[0]
+                best_window_threshold = window_threshold
+                best_score_threshold = score_threshold
 
         # Visualize the training
-        self.visualize_threshold(thresholds, f1_scores, best_window_threshold, 35)
+        self.visualize_threshold(list(windows), f1_scores, best_window_threshold, max(windows))
 
         # Adjust the sentiment with best thresholds
         self.tfidf_sentiment.get_context_polarity(best_window_threshold)
@@ -120,12 +153,38 @@ class Comparison:
         Writer.write_dataframe(self.dataframe, "labeled_paragraphs")
         return best_window_threshold, best_score_threshold
 
+    @staticmethod
+    def _train_window(
+        task: Tuple[np.ndarray, np.ndarray, float, Optional[float]],
+    ) -> Tuple[float, Tuple[float, float, float, float]]:
+        """
+        Searches the best score threshold for the context scores of one window size.
+
+        :param task: Tuple of the context scores, the labeled sentiment, the biggest score threshold and the distance
+        between the score thresholds (None to search all score thresholds where the mapping changes).
+        :return: Tuple of the best score threshold and its f1 scores for (total, positive, negative, neutral) labeled
+        data.
+        """
+        scores, labeled_sentiment, max_score_threshold, score_step = task
+        thresholds, f1_scores = Comparison.sweep_thresholds(scores, labeled_sentiment, max_score_threshold)
+
+        # The f1 scores of a threshold are the ones of the next smaller threshold where the mapping changes
+        if score_step is not None:
+            grid = np.arange(0, max_score_threshold, score_step)
+            f1_scores = f1_scores[np.searchsorted(thresholds, grid, "right") - 1]
+            thresholds = grid
+
+        best_index = int(np.argmax(f1_scores.sum(axis=1)))
+        best_f1_scores = f1_scores[best_index]
+        return float(thresholds[best_index]), (float(best_f1_scores.sum()), *best_f1_scores.tolist())
+
     def visualize_threshold(
         self,
         threshold: List[float],
         f1_scores: List[Tuple[float, float, float, float]],
         best_threshold: float,
         max_x: float,
+        steps: bool = False,
     ) -> None:
         """
         Visualize the results of training the threshold.
@@ -134,14 +193,25 @@ class Comparison:
         :param f1_scores: The f1 scores for (total, positive, negative, neutral) labeled data.
         :param best_threshold: The best threshold from training.
         :param max_x: The biggest x value of the data.
+        :param steps: If True, the f1 scores are constant from one threshold to the next one.
         """
         plt.axis((0, max_x, 0, 2))
+        drawstyle = "steps-post" if steps else "default"
+
+        # Extend the last step to the end of the axis
+        if steps:
+            threshold = threshold + [max_x]
+            f1_scores = f1_scores + [f1_scores[-1]]
 
         # Plot f1 scores as line graphs
-        plt.plot(threshold, [scores[0] for scores in f1_scores], color="black", label="f1 sum")
-        plt.plot(threshold, [scores[1] for scores in f1_scores], color="green", label="f1 positive")
-        plt.plot(threshold, [scores[2] for scores in f1_scores], color="orange", label="f1 negative")
-        plt.plot(threshold, [scores[3] for scores in f1_scores], color="blue", label="f1 neutral")
+        plt.plot(threshold, [scores[0] for scores in f1_scores], color="black", label="f1 sum", drawstyle=drawstyle)
+        plt.plot(
+            threshold, [scores[1] for scores in f1_scores], color="green", label="f1 positive", drawstyle=drawstyle
+        )
+        plt.plot(
+            threshold, [scores[2] for scores in f1_scores], color="orange", label="f1 negative", drawstyle=drawstyle
+        )
+        plt.plot(threshold, [scores[3] for scores in f1_scores], color="blue", label="f1 neutral", drawstyle=drawstyle)
 
         # Plot the best found threshold as vertical line
         plt.axvline(best_threshold, color="red", label="best threshold")
@@ -155,21 +225,10 @@ class Comparison:
         :return: Tuple of the precision scores for positive, negative and neutral labeled data for SentiWs, TextBlob
         and the context sentiment.
         """
-        labels = ["Positive", "Negative", "Neutral"]
-
-        # calculate precision for SentiWs
-        precision_sentiws = metrics.precision_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment"], labels=labels, average=None
-        )
-
-        # calculate precision for textblob
-        precision_textblob = metrics.precision_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment_textblob"], labels=labels, average=None
-        )
-
-        precision_context = metrics.precision_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment_context"], labels=labels, average=None
-        )
+        metrics_sentiws, metrics_textblob, metrics_context = self._get_metrics()
+        precision_sentiws = metrics_sentiws.precision()
+        precision_textblob = metrics_textblob.precision()
+        precision_context = metrics_context.precision()
 
         # Print the result
         self._output_metric(
@@ -187,21 +246,10 @@ class Comparison:
         :return: Tuple of the recall scores for positive, negative and neutral labeled data for SentiWs, TextBlob
         and the context sentiment.
         """
-        labels = ["Positive", "Negative", "Neutral"]
-
-        # calculate recall for sentiws
-        recall_sentiws = metrics.recall_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment"], labels=labels, average=None
-        )
-
-        # calculate recall for textblob
-        recall_textblob = metrics.recall_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment_textblob"], labels=labels, average=None
-        )
-
-        recall_context = metrics.recall_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment"], labels=labels, average=None
-        )
+        metrics_sentiws, metrics_textblob, metrics_context = self._get_metrics()
+        recall_sentiws = metrics_sentiws.recall()
+        recall_textblob = metrics_textblob.recall()
+        recall_context = metrics_context.recall()
 
         # Print the result
         self._output_metric(
@@ -220,22 +268,10 @@ class Comparison:
         :return: Tuple of the f1 scores for positive, negative and neutral labeled data for SentiWs, TextBlob
         and the context sentiment.
         """
-        labels = ["Positive", "Negative", "Neutral"]
-
-        # calculate f1 score for sentiws
-        f1_sentiws = metrics.f1_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment"], labels=labels, average=None
-        )
-
-        # calculate f1 score for textblob
-        f1_textblob = metrics.f1_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment_textblob"], labels=labels, average=None
-        )
-
-        # calculate context f1 score
-        f1_context = metrics.f1_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment_context"], labels=labels, average=None
-        )
+        metrics_sentiws, metrics_textblob, metrics_context = self._get_metrics()
+        f1_sentiws = metrics_sentiws.f1_score()
+        f1_textblob = metrics_textblob.f1_score()
+        f1_context = metrics_context.f1_score()
 
         # Print the result (not if threshold is trained)
         if not training:
@@ -253,17 +289,10 @@ class Comparison:
 
         :return: Tuple of the accuracy for SentiWs, TextBlob and the context sentiment.
         """
-        # calculate accuracy for sentiws
-        accuracy_sentiws = metrics.accuracy_score(self.dataframe["labeled_sentiment"], self.dataframe["sentiment"])
-
-        # calculate accuracy for textblob
-        accuracy_textblob = metrics.accuracy_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment_textblob"]
-        )
-
-        accuracy_context = metrics.accuracy_score(
-            self.dataframe["labeled_sentiment"], self.dataframe["sentiment_context"]
-        )
+        metrics_sentiws, metrics_textblob, metrics_context = self._get_metrics()
+        accuracy_sentiws = float(metrics_sentiws.accuracy())
+        accuracy_textblob = float(metrics_textblob.accuracy())
+        accuracy_context = float(metrics_context.accuracy())
 
         # Print the results
         print("==================== Accuracy ====================\n")
@@ -272,6 +301,20 @@ class Comparison:
         print("Context Sentiment: " + str(accuracy_context))
         return accuracy_sentiws, accuracy_textblob, accuracy_context
 
+    def _get_metrics(self) -> Tuple[SentimentMetrics, SentimentMetrics, SentimentMetrics]:
+        """
+        Builds the confusion matrices of SentiWS, TextBlob and the context sentiment with the labeled data.
+
+        :return: Tuple of the metrics for SentiWs, TextBlob and the context sentiment.
+        """
+        labeled_sentiment = self.dataframe["labeled_sentiment"]
+
+        return (
+            SentimentMetrics.from_sentiment(labeled_sentiment, self.dataframe["sentiment"]),
+            SentimentMetrics.from_sentiment(labeled_sentiment, self.dataframe["sentiment_textblob"]),
+            SentimentMetrics.from_sentiment(labeled_sentiment, self.dataframe["sentiment_context"]),
+        )
+
     def _output_metric(
         self,
         metric: str,
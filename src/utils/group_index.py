@@ -0,0 +1,153 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+
+class GroupIndex:
+    """
+    Class that indexes the parties and media of paragraphs: the parties of each row are packed into a bitmap (one bit
+    per party) and the media are stored as categorical codes, so filtering by parties and media (and any combination of
+    them) is an array operation instead of a scan over the rows.
+    """
+
+    def __init__(self, index: pd.Index, parties: Dict[str, int], party_bits: np.ndarray, media: pd.Categorical):
+        """
+        :param index: The index of the indexed rows.
+        :param parties: The bit of each party.
+        :param party_bits: The bitmap of the parties of each row.
+        :param media: The media of the rows.
+        """
+        self.index = index
+        self.parties = parties
+        self.party_bits = party_bits
+        self.media = media
+
+    @staticmethod
+    def from_dataframe(dataframe: DataFrame) -> "GroupIndex":
+        """
+        Builds the index of the parties and media of a dataframe in one pass over the rows.
+
+        :param dataframe: Dataframe with the columns "parties" and "media".
+        :return: The index of the rows of the dataframe.
+        """
+        parties: Dict[str, int] = {}
+        party_bits = [GroupIndex._encode_parties(row, parties) for row in dataframe["parties"]]
+
+        if len(parties) > 64:
+            raise ValueError("Only 64 different parties can be indexed, got {}".format(len(parties)))
+
+        return GroupIndex(
+            dataframe.index,
+            parties,
+            np.array(party_bits, dtype=np.uint64).reshape(len(dataframe)),
+            pd.Categorical(dataframe["media"]),
+        )
+
+    @staticmethod
+    def _encode_parties(row, parties: Dict[str, int]) -> int:
+        """
+        Packs the parties of a row into a bitmap, unknown parties get the next free bit.
+
+        :param row: The list of parties of the row (missing values have no parties).
+        :param parties: The bit of each party, new parties are added to it.
+        :return: The bitmap of the parties.
+        """
+        bits = 0
+
+        for party in row if isinstance(row, (list, tuple, np.ndarray)) else []:
+            bits |= 1 << parties.setdefault(party, len(parties))
+
+        return bits
+
+    @staticmethod
+    def of(dataframe: DataFrame, group_index: Optional["GroupIndex"] = None) -> "GroupIndex":
+        """
+        Get the index of the rows of a dataframe, selected from an existing index if possible.
+
+        :param dataframe: The (possibly filtered) dataframe.
+        :param group_index: An index built for all rows, if None the index is built from the dataframe.
+        :return: The index of the rows of the dataframe.
+        """
+        if group_index is None:
+            return GroupIndex.from_dataframe(dataframe)
+
+        return group_index.select(dataframe)
+
+    def __len__(self) -> int:
+        return len(self.party_bits)
+
+    def select(self, dataframe: DataFrame) -> "GroupIndex":
+        """
+        Selects the rows of a dataframe derived from the indexed dataframe (e.g. filtered by date). If the rows can not
+        be matched by their index, the index is built from the dataframe.
+
+        :param dataframe: The dataframe to select.
+        :return: The index of the rows of the dataframe.
+        """
+        if dataframe.index.equals(self.index):
+            return self
+
+        if not self.index.is_unique:
+            return GroupIndex.from_dataframe(dataframe)
+
+        rows = self.index.get_indexer(dataframe.index)
+
+        if (rows < 0).any():
+            return GroupIndex.from_dataframe(dataframe)
+
+        return GroupIndex(dataframe.index, self.parties, self.party_bits[rows], self.media[rows])
+
+    def party_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Expands the party bitmaps of all rows at once to one entry per row and party.
+
+        :return: Tuple of the row and the position of the party (in the order of parties) of each entry.
+        """
+        party_matrix = np.unpackbits(
+            self.party_bits.astype("<u8").view(np.uint8).reshape(len(self), 8), axis=1, bitorder="little"
+        )
+        return np.nonzero(party_matrix[:, : len(self.parties)])
+
+    def party_mask(self, party: str, only: bool = False) -> np.ndarray:
+        """
+        Get the rows of a party.
+
+        :param party: The party.
+        :param only: If True, only rows about this party and no other party are selected.
+        :return: Boolean array that is True for each selected row.
+        """
+        if party not in self.parties:
+            return np.zeros(len(self), dtype=bool)
+
+        bit = np.uint64(1 << self.parties[party])
+
+        if only:
+            return self.party_bits == bit
+
+        return (self.party_bits & bit) != 0
+
+    def media_mask(self, media: str) -> np.ndarray:
+        """
+        Get the rows of a media outlet.
+
+        :param media: The media outlet.
+        :return: Boolean array that is True for each selected row.
+        """
+        if media not in self.media.categories:
+            return np.zeros(len(self), dtype=bool)
+
+        return self.media.codes == self.media.categories.get_loc(media)
+
+    def group_masks(self, parties: List[str], media: List[str], only: bool = False) -> np.ndarray:
+        """
+        Get the rows of several parties and media.
+
+        :param parties: The parties of the first masks.
+        :param media: The media outlets of the following masks.
+        :param only: If True, only rows about a single party are selected for the parties.
+        :return: Boolean array with a row for each party and media outlet that is True for each selected row.
+        """
+        masks = [self.party_mask(party, only) for party in parties] + [self.media_mask(m) for m in media]
+        return np.array(masks, dtype=bool).reshape(len(masks), len(self))
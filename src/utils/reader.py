@@ -1,40 +1,181 @@
+import itertools
 import json
-from typing import Optional
+import os
+import random
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
+from utils.vocabulary import Vocabulary
+
 
 class Reader:
     """
     Class that reads the news articles from the json files.
     """
 
+    dtypes = {
+        "title": "string",
+        "text": "string",
+        "summary": "string",
+        "date": "string",
+        "authors": "object",
+        "references": "object",
+    }
+
+    # Column of the position of each row in the stored columns it was read from, see read_columns and load_columns
+    row_id_column = "row_id"
+
     @staticmethod
-    def read_articles(number_of_samples: Optional[int] = None) -> DataFrame:
+    def read_articles(number_of_samples: Optional[int] = None, stratified: bool = False) -> DataFrame:
         """
-        Reads the news article for every news agency and returns them.
+        Reads the news article for every news agency and returns them. The articles are streamed from the json files,
+        if a number of samples is given, they are sampled with reservoir sampling while reading, so only the sampled
+        articles are kept in memory.
 
         :param number_of_samples: Number of samples to read. If None returns all available articles.
+        :param stratified: If True, the samples are drawn from each media in proportion to its number of articles.
         :return: Dataframe containing the articles.
         """
-        df_tagesschau_articles = Reader.read("src/data/tagesschau.json")
-        df_tagesschau_articles["media"] = "Tagesschau"
+        sources = [
+            ("src/data/tagesschau.json", "Tagesschau"),
+            ("src/data/taz.json", "TAZ"),
+            ("src/data/bild.json", "Bild"),
+        ]
+        streams = [Reader._stream_media_articles(path, media) for path, media in sources]
 
-        df_taz_articles = Reader.read("src/data/taz.json")
-        df_taz_articles["media"] = "TAZ"
+        if number_of_samples is None:
+            articles = [article for stream in streams for article in stream]
+        elif stratified:
+            reservoirs = [Reader._reservoir_sample(stream, number_of_samples) for stream in streams]
+            sizes = Reader._allocate_samples([count for _, count in reservoirs], number_of_samples)
+            articles = [
+                article for (reservoir, _), size in zip(reservoirs, sizes) for article in random.sample(reservoir, size)
+            ]
+            random.shuffle(articles)
+        else:
+            articles, _ = Reader._reservoir_sample(itertools.chain(*streams), number_of_samples)
 
-        df_bild_articles = Reader.read("src/data/bild.json")
-        df_bild_articles["media"] = "Bild"
-
-        df_articles = df_tagesschau_articles.append(df_taz_articles).append(df_bild_articles)
-
-        if number_of_samples is not None:
-            df_articles = df_articles.sample(number_of_samples).reset_index(drop=True)
+        df_articles = pd.DataFrame(articles)
+        df_articles = df_articles.astype(
+            {column: dtype for column, dtype in Reader.dtypes.items() if column in df_articles}
+        )
 
         print("Number of articles: {}".format(len(df_articles)))
         return df_articles
 
+    @staticmethod
+    def stream_articles(path: str, chunk_size: int = 1 << 20) -> Iterator[dict]:
+        """
+        Reads the articles array of a json file incrementally and yields one article after another without loading the
+        whole file.
+
+        :param path: Path to json file.
+        :param chunk_size: Number of characters that are read from the file at once.
+        :return: Iterator over the articles.
+        """
+        decoder = json.JSONDecoder()
+        articles_pattern = re.compile(r'"articles"\s*:\s*\[')
+
+        with open(path, encoding="utf8") as json_file:
+            buffer = ""
+            position = None
+
+            # Find the beginning of the articles array
+            while position is None:
+                chunk = json_file.read(chunk_size)
+
+                if not chunk:
+                    return
+
+                buffer += chunk
+                match = articles_pattern.search(buffer)
+                position = match.end() if match else None
+
+            while True:
+                # Skip whitespace and separators between the articles
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+
+                if position < len(buffer) and buffer[position] == "]":
+                    return
+
+                try:
+                    article, position = decoder.raw_decode(buffer, position)
+                    yield article
+                except json.JSONDecodeError:
+                    # The article is not complete, read the next chunk
+                    chunk = json_file.read(chunk_size)
+
+                    if not chunk:
+                        raise
+
+                    buffer = buffer[position:] + chunk
+                    position = 0
+
+    @staticmethod
+    def _stream_media_articles(path: str, media: str) -> Iterator[dict]:
+        """
+        Streams the articles of a json file and adds the media to each article.
+
+        :param path: Path to json file.
+        :param media: Name of the media.
+        :return: Iterator over the articles.
+        """
+        for article in Reader.stream_articles(path):
+            article["media"] = media
+            yield article
+
+    @staticmethod
+    def _reservoir_sample(articles: Iterable[dict], number_of_samples: int) -> Tuple[List[dict], int]:
+        """
+        Draws a uniform random sample from a stream of articles with reservoir sampling.
+
+        :param articles: Stream of articles.
+        :param number_of_samples: Size of the sample.
+        :return: Tuple of the sampled articles and the number of articles in the stream.
+        """
+        reservoir: List[dict] = []
+        count = 0
+
+        for count, article in enumerate(articles, start=1):
+            if len(reservoir) < number_of_samples:
+                reservoir.append(article)
+            else:
+                index = random.randrange(count)
+
+                if index < number_of_samples:
+                    reservoir[index] = article
+
+        return reservoir, count
+
+    @staticmethod
+    def _allocate_samples(counts: List[int], number_of_samples: int) -> List[int]:
+        """
+        Splits the number of samples proportionally to the number of articles of each media (largest remainder method).
+
+        :param counts: Number of articles of each media.
+        :param number_of_samples: Total number of samples.
+        :return: Number of samples of each media.
+        """
+        total = sum(counts)
+        number_of_samples = min(number_of_samples, total)
+
+        if total == 0:
+            return [0] * len(counts)
+
+        quotas = [count * number_of_samples / total for count in counts]
+        sizes = [int(quota) for quota in quotas]
+        remainders = sorted(range(len(counts)), key=lambda index: quotas[index] - sizes[index], reverse=True)
+
+        for index in remainders[: number_of_samples - sum(sizes)]:
+            sizes[index] += 1
+
+        return sizes
+
     @staticmethod
     def read_json_to_df_default(path: str) -> pd.DataFrame:
         """
@@ -53,22 +194,163 @@ class Reader:
             return df
 
     @staticmethod
-    def read(path: str) -> pd.DataFrame:
+    def read_columns(path: str, columns: Optional[List[str]] = None, row_ids: bool = False) -> pd.DataFrame:
         """
-        Helper function to read a json from a file and store it in pandas dataframe.
+        Read a dataframe that was stored in the columnar format of Writer.write_columns.
 
-        :param path: Path to json file.
-        :return: Dataframe of JSON articles parsed from the input file.
+        :param path: the path of the directory containing the columns.
+        :param columns: the columns to read. If None, all columns are read.
+        :param row_ids: If True, the position of each row in the stored columns is added as column "row_id", so the
+        other columns can be added later with load_columns.
+        :return: Dataframe build from the stored columns.
         """
-        with open(path, encoding="utf8") as json_file:
-            json_dict = json.load(json_file)["articles"]
-            return pd.DataFrame(json_dict).astype(
-                {
-                    "title": "string",
-                    "text": "string",
-                    "summary": "string",
-                    "date": "string",
-                    "authors": "object",
-                    "references": "object",
-                }
+        with open(os.path.join(path, "columns.json"), encoding="utf8") as json_file:
+            layout = json.load(json_file)
+
+        data = {}
+        vocabulary = None
+
+        for column in layout["columns"]:
+            if columns is None or column["name"] in columns:
+                # The shared vocabulary is only read if a column needs it
+                if column["kind"] == "list_token" and vocabulary is None:
+                    vocabulary = Reader.read_vocabulary(path).to_array()
+
+                data[column["name"]] = Reader._decode_column(path, column, layout["rows"], vocabulary)
+
+        if row_ids:
+            data[Reader.row_id_column] = np.arange(layout["rows"], dtype=np.int64)
+
+        return pd.DataFrame(data, index=pd.RangeIndex(layout["rows"]))
+
+    @staticmethod
+    def load_columns(dataframe: DataFrame, path: str, columns: Optional[List[str]] = None) -> DataFrame:
+        """
+        Adds stored columns to a dataframe that was read with read_columns and row ids. The values are selected by the
+        row ids and not by the index, so the rows may be filtered, reordered or reindexed in between. The stored columns
+        must not be rewritten in between.
+
+        :param dataframe: the dataframe with the column "row_id".
+        :param path: the path of the directory containing the columns.
+        :param columns: the columns to add, columns of the dataframe are kept. If None, all stored columns are added.
+        :return: Dataframe with the added columns.
+        """
+        with open(os.path.join(path, "columns.json"), encoding="utf8") as json_file:
+            layout = json.load(json_file)
+
+        missing_columns = [
+            column["name"]
+            for column in layout["columns"]
+            if (columns is None or column["name"] in columns) and column["name"] not in dataframe
+        ]
+
+        if not missing_columns:
+            return dataframe
+
+        if Reader.row_id_column not in dataframe:
+            raise ValueError("The dataframe has no row ids of the stored columns in {}".format(path))
+
+        rows = dataframe[Reader.row_id_column].to_numpy()
+
+        if len(rows) > 0 and (rows.min() < 0 or rows.max() >= layout["rows"]):
+            raise ValueError("The row ids of the dataframe are not rows of the stored columns in {}".format(path))
+
+        df_stored = Reader.read_columns(path, missing_columns).iloc[rows]
+        return dataframe.assign(**{column: df_stored[column].array for column in missing_columns})
+
+    @staticmethod
+    def read_vocabulary(path: str) -> Vocabulary:
+        """
+        Read the vocabulary shared by the token columns that were stored with Writer.write_columns.
+
+        :param path: the path of the directory containing the columns.
+        :return: The vocabulary, empty if no vocabulary was stored.
+        """
+        if not os.path.exists(os.path.join(path, "vocabulary.values.npy")):
+            return Vocabulary()
+
+        arrays = [
+            np.load(os.path.join(path, "vocabulary.{}.npy".format(name))) for name in ["values", "offsets", "mask"]
+        ]
+        return Vocabulary(Reader._decode_strings(*arrays))
+
+    @staticmethod
+    def read_token_ids(path: str, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Read the token ids of a column that was stored with Writer.write_columns without decoding the tokens.
+
+        :param path: the path of the directory containing the columns.
+        :param column: the name of the token column.
+        :return: Tuple of the concatenated ids (into the vocabulary of Reader.read_vocabulary) of all rows and the
+        offsets of the rows in it.
+        """
+        with open(os.path.join(path, "columns.json"), encoding="utf8") as json_file:
+            layout = {stored_column["name"]: stored_column for stored_column in json.load(json_file)["columns"]}
+
+        if layout[column]["kind"] != "list_token":
+            raise ValueError("Column {} is not stored as token ids".format(column))
+
+        file = os.path.join(path, layout[column]["file"])
+        return np.load(file + ".values.npy"), np.load(file + ".offsets.npy")
+
+    @staticmethod
+    def _decode_column(
+        path: str, column: dict, rows: int, vocabulary: Optional[np.ndarray] = None
+    ) -> Union[list, np.ndarray, pd.Categorical]:
+        """
+        Decodes a column that was encoded by Writer.write_columns.
+
+        :param path: the path of the directory containing the columns.
+        :param column: the layout of the column (name, file and kind).
+        :param rows: number of rows of the stored dataframe.
+        :param vocabulary: the terms of the shared vocabulary, needed for token columns.
+        :return: The values of the column.
+        """
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(path, "{}.{}.npy".format(column["file"], name)), allow_pickle=False)
+
+        kind = column["kind"]
+
+        if kind == "numeric":
+            return load("values")
+
+        if kind == "categorical":
+            categories = Reader._decode_strings(
+                load("categories_values"), load("categories_offsets"), load("categories_mask")
             )
+            return pd.Categorical.from_codes(load("values"), categories=categories)
+
+        if kind in ["string", "json"]:
+            strings = Reader._decode_strings(load("values"), load("offsets"), load("mask"))
+            return strings if kind == "string" else [json.loads(value) for value in strings]
+
+        offsets = load("offsets").tolist()
+
+        if kind == "list_token":
+            flat = vocabulary[load("values")].tolist()
+        else:
+            flat = load("values").tolist()
+
+            if kind == "list_float_none":
+                flat = [None if value != value else value for value in flat]
+
+        return [flat[offsets[i] : offsets[i + 1]] for i in range(rows)]
+
+    @staticmethod
+    def _decode_strings(values: np.ndarray, offsets: np.ndarray, mask: np.ndarray) -> list:
+        """
+        Decodes strings that are stored as one utf-8 byte array with offsets.
+
+        :param values: the utf-8 bytes of all strings.
+        :param offsets: the start and end offsets of the strings in the byte array.
+        :param mask: True for missing values.
+        :return: List of the strings, None for missing values.
+        """
+        data = values.tobytes()
+        offsets = offsets.tolist()
+
+        return [
+            None if missing else data[offsets[i] : offsets[i + 1]].decode("utf-8")
+            for i, missing in enumerate(mask.tolist())
+        ]
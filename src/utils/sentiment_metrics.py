@@ -0,0 +1,93 @@
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+SENTIMENT_LABELS = ["Positive", "Negative", "Neutral"]
+
+
+class SentimentMetrics:
+    """
+    Class that derives precision, recall, f1 score and accuracy of a sentiment method from its confusion matrix. The
+    confusion matrix can also be a stack of confusion matrices (e.g. one for each threshold), then every metric is
+    calculated for each of them.
+    """
+
+    def __init__(self, confusion: np.ndarray):
+        """
+        :param confusion: Confusion matrix with the labeled sentiment in the rows and the mapped sentiment in the
+        columns, both in the order of SENTIMENT_LABELS.
+        """
+        self.confusion = confusion
+
+    @staticmethod
+    def from_sentiment(labeled_sentiment: Iterable, mapped_sentiment: Iterable) -> "SentimentMetrics":
+        """
+        Builds the confusion matrix of the labeled and the mapped sentiment. Paragraphs with an unknown sentiment are
+        ignored.
+
+        :param labeled_sentiment: The labeled sentiment of the paragraphs.
+        :param mapped_sentiment: The mapped sentiment of the paragraphs.
+        :return: The metrics of the mapped sentiment.
+        """
+        labeled_codes = SentimentMetrics.encode(labeled_sentiment)
+        mapped_codes = SentimentMetrics.encode(mapped_sentiment)
+        known = (labeled_codes >= 0) & (mapped_codes >= 0)
+
+        confusion = np.bincount(
+            labeled_codes[known] * len(SENTIMENT_LABELS) + mapped_codes[known], minlength=len(SENTIMENT_LABELS) ** 2
+        )
+        return SentimentMetrics(confusion.reshape(len(SENTIMENT_LABELS), len(SENTIMENT_LABELS)))
+
+    @staticmethod
+    def encode(sentiment: Iterable) -> np.ndarray:
+        """
+        Encodes the sentiment as the index of its label in SENTIMENT_LABELS.
+
+        :param sentiment: The sentiment of the paragraphs.
+        :return: Array of the codes (-1 for an unknown sentiment).
+        """
+        return np.asarray(pd.Categorical(sentiment, categories=SENTIMENT_LABELS).codes, dtype=np.int64)
+
+    def precision(self) -> np.ndarray:
+        """
+        :return: The precision for positive, negative and neutral labeled data (0 if a label was never mapped).
+        """
+        return self._divide(self._true_positives(), self.confusion.sum(axis=-2))
+
+    def recall(self) -> np.ndarray:
+        """
+        :return: The recall for positive, negative and neutral labeled data (0 if a label was never labeled).
+        """
+        return self._divide(self._true_positives(), self.confusion.sum(axis=-1))
+
+    def f1_score(self) -> np.ndarray:
+        """
+        :return: The f1 score for positive, negative and neutral labeled data (0 if a label was neither labeled nor
+        mapped).
+        """
+        return self._divide(2 * self._true_positives(), self.confusion.sum(axis=-1) + self.confusion.sum(axis=-2))
+
+    def accuracy(self) -> np.ndarray:
+        """
+        :return: The share of paragraphs where the mapped sentiment is the labeled sentiment.
+        """
+        return self._divide(self._true_positives().sum(axis=-1), self.confusion.sum(axis=(-2, -1)))
+
+    def _true_positives(self) -> np.ndarray:
+        """
+        :return: The number of correctly mapped paragraphs of each label.
+        """
+        return np.diagonal(self.confusion, axis1=-2, axis2=-1)
+
+    @staticmethod
+    def _divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+        """
+        Divides the arrays and uses 0 where the denominator is 0.
+
+        :param numerator: The numerator.
+        :param denominator: The denominator.
+        :return: The quotient.
+        """
+        numerator = np.asarray(numerator, dtype=np.float64)
+        return np.divide(numerator, denominator, out=np.zeros(numerator.shape), where=np.asarray(denominator) > 0)
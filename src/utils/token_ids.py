@@ -0,0 +1,113 @@
+from typing import Optional
+
+import numpy as np
+from pandas import DataFrame
+from scipy.sparse import csr_matrix
+
+from utils.reader import Reader
+from utils.vocabulary import Vocabulary
+
+
+class TokenIds:
+    """
+    Class that holds a token column of a dataframe as ragged int32 ids into a vocabulary: the ids of all rows are
+    concatenated and the offsets mark where each row starts.
+    """
+
+    def __init__(self, vocabulary: Vocabulary, ids: np.ndarray, offsets: np.ndarray):
+        """
+        :param vocabulary: The vocabulary of the ids.
+        :param ids: The concatenated ids of all rows.
+        :param offsets: The offsets of the rows in the ids.
+        """
+        self.vocabulary = vocabulary
+        self.ids = ids
+        self.offsets = offsets
+
+    @staticmethod
+    def from_dataframe(dataframe: DataFrame, column: str, column_path: Optional[str] = None) -> "TokenIds":
+        """
+        Get the token ids of a column. If the column is not loaded, the stored ids of the rows are read directly (see
+        from_stored_columns), otherwise the tokens are mapped to ids of a new vocabulary.
+
+        :param dataframe: The dataframe containing the token column or the row ids of the stored columns.
+        :param column: The name of the column containing a list of tokens in each row.
+        :param column_path: The directory of the stored columns the dataframe was read from, if any.
+        :return: The token ids of the column.
+        """
+        if column not in dataframe and column_path is not None:
+            return TokenIds.from_stored_columns(column_path, column, dataframe[Reader.row_id_column].to_numpy())
+
+        vocabulary = Vocabulary()
+        ids, offsets = vocabulary.encode_lists(dataframe[column])
+        return TokenIds(vocabulary, ids, offsets)
+
+    @staticmethod
+    def from_stored_columns(path: str, column: str, rows: Optional[np.ndarray] = None) -> "TokenIds":
+        """
+        Reads the token ids of a column that was stored with Writer.write_columns without decoding the tokens.
+
+        :param path: The path of the directory containing the columns.
+        :param column: The name of the token column.
+        :param rows: The positions of the rows in the stored columns (e.g. the row ids of Reader.read_columns). If None,
+        the ids of all rows are read.
+        :return: The token ids of the rows with the shared vocabulary of the stored columns.
+        """
+        tokens = TokenIds(Reader.read_vocabulary(path), *Reader.read_token_ids(path, column))
+
+        if rows is None or np.array_equal(rows, np.arange(len(tokens))):
+            return tokens
+
+        return tokens.select(rows)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def rows(self) -> np.ndarray:
+        """
+        :return: Array containing the row of each id.
+        """
+        return np.repeat(np.arange(len(self)), np.diff(self.offsets))
+
+    def select(self, rows: np.ndarray) -> "TokenIds":
+        """
+        Selects the ids of rows, the vocabulary is shared.
+
+        :param rows: The positions of the selected rows.
+        :return: The token ids of the selected rows.
+        """
+        lengths = self.offsets[rows + 1] - self.offsets[rows]
+        offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        positions = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - self.offsets[rows], lengths)
+
+        return TokenIds(self.vocabulary, self.ids[positions], offsets)
+
+    def count_matrix(
+        self,
+        term_ids: Optional[np.ndarray] = None,
+        number_of_terms: Optional[int] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> csr_matrix:
+        """
+        Counts the terms of each row as sparse matrix.
+
+        :param term_ids: The term of each id of the vocabulary. If None, every id is its own term.
+        :param number_of_terms: The number of terms. If None, the number of terms is the size of the vocabulary.
+        :param mask: Ids of the vocabulary that are counted. If None, all ids are counted.
+        :return: Sparse matrix containing the count of each term (columns) in each row (rows).
+        """
+        ids = self.ids
+        rows = self.rows()
+
+        if mask is not None:
+            rows = rows[mask[ids]]
+            ids = ids[mask[ids]]
+
+        if term_ids is not None:
+            ids = term_ids[ids]
+
+        if number_of_terms is None:
+            number_of_terms = len(self.vocabulary)
+
+        return csr_matrix((np.ones(len(ids)), (rows, ids)), shape=(len(self), number_of_terms))
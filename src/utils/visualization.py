@@ -6,6 +6,7 @@ import numpy as np
 from matplotlib.figure import Figure
 from pandas import DataFrame
 
+from utils.aggregation_cube import AggregationCube
 from utils.statistics import Statistics
 
 
@@ -29,51 +30,62 @@ class Visualization:
     }
 
     @staticmethod
-    def get_basic_statistic_bar_plot(dataframe: DataFrame, parties: List[str], media: List[str]) -> Figure:
+    def get_basic_statistic_bar_plot(
+        dataframe: DataFrame, parties: List[str], media: List[str], cube: Optional[AggregationCube] = None
+    ) -> Figure:
         """
         Get the basic statistic (document distribution) figures.
 
         :param dataframe: Dataframe to extract the statistics from.
         :param parties: Parties to consider for the statistics.
         :param media: Media to consider for the statistics.
+        :param cube: Counts of the paragraphs of the dataframe. If None, they are calculated from the dataframe.
         :return: Figures containing the bar charts for each party.
         """
-        x, y = Statistics.get_basic_statistics(dataframe, media, parties)
+        x, y = Statistics.get_basic_statistics(dataframe, media, parties, cube)
         return Visualization._get_document_distribution_figure(x, y)
 
     @staticmethod
-    def get_media_statistics_bar_plots(dataframe: DataFrame, parties: List[str], media: List[str]) -> List[Figure]:
+    def get_media_statistics_bar_plots(
+        dataframe: DataFrame, parties: List[str], media: List[str], cube: Optional[AggregationCube] = None
+    ) -> List[Figure]:
         """
         Get the basic statistic (document distribution) figures of each media.
 
         :param dataframe: Dataframe to extract the statistics from.
         :param parties: Parties to consider for the statistics.
         :param media: Media to consider for the statistics.
+        :param cube: Counts of the paragraphs of the dataframe. If None, they are calculated from the dataframe.
         :return: Figures containing the bar charts for each party.
         """
+        cube = AggregationCube.of(dataframe, cube)
         figures = []
 
         for outlet in media:
-            x, y = Statistics.get_media_statistics(dataframe, outlet, parties)
+            x, y = Statistics.get_media_statistics(dataframe, outlet, parties, cube)
             fig = Visualization._get_document_distribution_figure(x, y, outlet)
             figures.append(fig)
 
         return figures
 
     @staticmethod
-    def get_party_statistics_bar_plots(dataframe: DataFrame, parties: List[str], media: List[str]) -> List[Figure]:
+    def get_party_statistics_bar_plots(
+        dataframe: DataFrame, parties: List[str], media: List[str], cube: Optional[AggregationCube] = None
+    ) -> List[Figure]:
         """
         Get the basic statistic (document distribution) figures of each party.
 
         :param dataframe: Dataframe to extract the statistics from.
         :param parties: Parties to consider for the statistics.
         :param media: Media to consider for the statistics.
+        :param cube: Counts of the paragraphs of the dataframe. If None, they are calculated from the dataframe.
         :return: Figures containing the bar charts for each party.
         """
+        cube = AggregationCube.of(dataframe, cube)
         figures = []
 
         for party in parties:
-            x, y = Statistics.get_party_statistics(dataframe, party, media)
+            x, y = Statistics.get_party_statistics(dataframe, party, media, cube)
             fig = Visualization._get_document_distribution_figure(x, y, party)
             figures.append(fig)
 
@@ -124,7 +136,11 @@ class Visualization:
 
     @staticmethod
     def get_sentiment_pie_charts(
-        df_paragraphs: DataFrame, by_party: bool = True, parties: List[str] = None, media: List[str] = None
+        df_paragraphs: DataFrame,
+        by_party: bool = True,
+        parties: List[str] = None,
+        media: List[str] = None,
+        cube: Optional[AggregationCube] = None,
     ) -> List[Figure]:
         """
         Get figures of pie charts for the sentiment either grouped by party or by media outlet.
@@ -133,12 +149,13 @@ class Visualization:
         :param by_party: If True, group data by party, otherwise group by media
         :param parties: List of parties to consider. Defaults to all parties.
         :param media: List of media outlets to consider. Defaults to all media outlets.
+        :param cube: Counts of the paragraphs of the dataframe. If None, they are calculated from the dataframe.
 
         :return: List of figures containing the pie charts
         """
 
         # Get sentiment statistics
-        statistics = Statistics.get_sentiment_statistics(df_paragraphs, by_party, parties, media)
+        statistics = Statistics.get_sentiment_statistics(df_paragraphs, by_party, parties, media, cube)
 
         # Define label and colors for pie charts
         labels = ["Positive", "Negative", "Neutral"]
@@ -0,0 +1,104 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pandas import Series
+
+
+class Vocabulary:
+    """
+    Class that interns terms: every distinct term gets an integer id, so tokens can be stored and processed as ids and
+    work on the strings is done once per term instead of once per token.
+    """
+
+    def __init__(self, terms: Optional[Iterable[str]] = None):
+        """
+        :param terms: Terms that are added to the vocabulary in the given order.
+        """
+        self.terms: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+        if terms is not None:
+            self.encode(terms)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.ids
+
+    def add(self, term: str) -> int:
+        """
+        Adds a term to the vocabulary if it is not contained yet.
+
+        :param term: The term to add.
+        :return: The id of the term.
+        """
+        term_id = self.ids.get(term)
+
+        if term_id is None:
+            term_id = len(self.terms)
+            self.ids[term] = term_id
+            self.terms.append(term)
+
+        return term_id
+
+    def encode(self, tokens: Iterable[str]) -> np.ndarray:
+        """
+        Maps tokens to the ids of their terms, unknown terms are added to the vocabulary.
+
+        :param tokens: The tokens to encode.
+        :return: Array containing the id of each token.
+        """
+        return np.fromiter((self.add(token) for token in tokens), dtype=np.int32)
+
+    def encode_lists(self, series: Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Maps the tokens of all rows to the ids of their terms.
+
+        :param series: Series containing a list of tokens in each row.
+        :return: Tuple of the concatenated ids of all rows and the offsets of the rows in it.
+        """
+        lists = series.tolist()
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(tokens) for tokens in lists])
+
+        return self.encode(token for tokens in lists for token in tokens), offsets
+
+    def decode(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Maps ids back to their terms.
+
+        :param ids: The ids to decode.
+        :return: Array containing the term of each id.
+        """
+        return self.to_array()[ids]
+
+    def to_array(self) -> np.ndarray:
+        """
+        :return: Array containing all terms, the index of a term is its id.
+        """
+        terms = np.empty(len(self.terms), dtype=object)
+        terms[:] = self.terms
+        return terms
+
+    def map_terms(self, function: Callable[[str], object], dtype: type = object) -> np.ndarray:
+        """
+        Applies a function once to every term of the vocabulary. The result for a token is the entry of its id.
+
+        :param function: The function to apply.
+        :param dtype: The type of the results.
+        :return: Array containing the result for each term.
+        """
+        results = np.empty(len(self.terms), dtype=dtype)
+        results[:] = [function(term) for term in self.terms]
+        return results
+
+    def map_vocabulary(self, function: Callable[[str], str]) -> Tuple["Vocabulary", np.ndarray]:
+        """
+        Maps every term to a new term, terms with the same result share an id in the new vocabulary.
+
+        :param function: The function that maps a term to the new term.
+        :return: Tuple of the new vocabulary and the new id of each term.
+        """
+        vocabulary = Vocabulary()
+        return vocabulary, vocabulary.encode(function(term) for term in self.terms)
@@ -1,9 +1,19 @@
-from pandas import DataFrame
+import json
+import os
+import shutil
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
+
+from utils.reader import Reader
+from utils.vocabulary import Vocabulary
 
 
 class Writer:
     """
-    Class that writes a dataframe to a json file.
+    Class that writes a dataframe to a json file or in a columnar format.
     """
 
     @staticmethod
@@ -17,3 +27,124 @@ class Writer:
         path = "src/output/" + filename + ".json"
         with open(path, "w", encoding="utf-8") as file:
             dataframe.to_json(file, force_ascii=False, orient="records", default_handler=str, index=True)
+
+    @staticmethod
+    def write_columns(dataframe: DataFrame, filename: str) -> None:
+        """
+        Stores a Pandas dataframe in a columnar format. Every column is stored in its own numpy files inside the
+        directory "src/output/<filename>", list columns are stored as flat values plus row offsets, strings as utf-8
+        bytes plus offsets and categorical columns as codes plus categories. Lists of strings (e.g. tokens) are stored
+        as int32 ids into one vocabulary shared by all columns. The layout of the columns is described in the file
+        "columns.json" of the directory.
+
+        :param dataframe: the Pandas dataframe which should be stored
+        :param filename: the name of the directory where the dataframe should be stored
+        """
+        path = "src/output/" + filename
+        temp_path = path + ".tmp"
+
+        if os.path.exists(temp_path):
+            shutil.rmtree(temp_path)
+
+        os.makedirs(temp_path)
+        columns = []
+        vocabulary = Vocabulary()
+
+        # Row ids are the positions of the rows in the stored columns they were read from, they are not stored again
+        stored_columns = [column for column in dataframe.columns if column != Reader.row_id_column]
+
+        for index, column in enumerate(stored_columns):
+            arrays, kind = Writer._encode_column(dataframe[column], vocabulary)
+
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_path, "{}.{}.npy".format(index, name)), array)
+
+            columns.append({"name": column, "file": str(index), "kind": kind})
+
+        for name, array in Writer._encode_strings(vocabulary.terms).items():
+            np.save(os.path.join(temp_path, "vocabulary.{}.npy".format(name)), array)
+
+        with open(os.path.join(temp_path, "columns.json"), "w", encoding="utf-8") as file:
+            json.dump({"rows": len(dataframe), "columns": columns}, file, ensure_ascii=False)
+
+        # Replace the previous data only after the new data is complete
+        if os.path.exists(path):
+            shutil.rmtree(path)
+
+        os.rename(temp_path, path)
+
+    @staticmethod
+    def _encode_column(series: Series, vocabulary: Vocabulary) -> (Dict[str, np.ndarray], str):
+        """
+        Encodes a column as numpy arrays depending on the type of its values.
+
+        :param series: the column to encode
+        :param vocabulary: the vocabulary for lists of strings, new strings are added to it
+        :return: Tuple of the arrays to store and the kind of the column
+        """
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Store the codes and the categories of categorical columns
+            arrays = Writer._encode_strings([str(category) for category in series.cat.categories])
+            arrays = {"categories_" + name: array for name, array in arrays.items()}
+            arrays["values"] = series.cat.codes.to_numpy()
+            return arrays, "categorical"
+
+        if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy()
+
+            # Nullable extension types are converted to floats with NaN for missing values
+            if values.dtype == object:
+                values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+
+            return {"values": values}, "numeric"
+
+        values = series.tolist()
+        not_null = [value for value in values if isinstance(value, (list, tuple, np.ndarray)) or not pd.isna(value)]
+
+        if all(isinstance(value, str) for value in not_null):
+            return Writer._encode_strings(values), "string"
+
+        if all(isinstance(value, (list, tuple, np.ndarray)) for value in not_null):
+            # Treat missing lists as empty lists
+            lists = [value if isinstance(value, (list, tuple, np.ndarray)) else [] for value in values]
+            offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(value) for value in lists])
+            flat = [item for value in lists for item in value]
+
+            if all(isinstance(item, str) for item in flat):
+                # Store strings of lists as ids into the shared vocabulary
+                return {"values": vocabulary.encode(flat), "offsets": offsets}, "list_token"
+
+            if all(item is None or isinstance(item, (int, float, np.number)) for item in flat):
+                if all(isinstance(item, (int, np.integer)) and not isinstance(item, bool) for item in flat):
+                    flat_values = np.array(flat, dtype=np.int64)
+                    kind = "list_int"
+                else:
+                    flat_values = np.array([np.nan if item is None else item for item in flat], dtype=np.float64)
+                    kind = "list_float_none" if any(item is None for item in flat) else "list_float"
+
+                return {"values": flat_values, "offsets": offsets}, kind
+
+        # Store everything else as json strings
+        return Writer._encode_strings([json.dumps(value, ensure_ascii=False, default=str) for value in values]), "json"
+
+    @staticmethod
+    def _encode_strings(values: List[Any]) -> Dict[str, np.ndarray]:
+        """
+        Encodes strings as one utf-8 byte array and the offsets of the strings in it. Missing values are marked in a
+        mask.
+
+        :param values: the strings to encode (None or NaN for missing values)
+        :return: Dictionary with the byte values, the offsets and the mask of missing values
+        """
+        mask = np.array([not isinstance(value, str) for value in values], dtype=bool)
+        encoded = [value.encode("utf-8") if isinstance(value, str) else b"" for value in values]
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) for value in encoded])
+
+        return {
+            "values": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "offsets": offsets,
+            "mask": mask,
+        }
@@ -0,0 +1,98 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import shutil
+import unittest
+
+import numpy as np
+from pandas import Categorical, DataFrame
+
+from utils.aggregate_store import AggregateStore
+from utils.aggregation_cube import AggregationCube
+
+
+class AggregateStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.df_paragraphs = DataFrame(
+            {
+                "article_hash": ["a", "a", "b", "c", "c"],
+                "parties": [["CDU"], ["CDU", "SPD"], ["SPD"], [], ["Grüne", "CDU"]],
+                "media": ["Bild", "Bild", "TAZ", "Tagesschau", "Tagesschau"],
+                "date": ["2020-09-01", "2020-09-01", np.nan, "2020-10-01", "2020-10-01"],
+                "sentiment": Categorical(
+                    ["Positive", "Negative", "Neutral", "Positive", "Negative"],
+                    categories=["Positive", "Negative", "Neutral"],
+                ),
+                "sentiment_score": [0.5, -0.25, 0.0, 0.75, -0.5],
+            }
+        )
+
+    def tearDown(self):
+        if os.path.exists("src/output/aggregate_store_test"):
+            shutil.rmtree("src/output/aggregate_store_test")
+            os.remove("src/output/aggregate_store_test_hashes.json")
+
+    def test_get_cube(self):
+        store = AggregateStore(AggregateStore.aggregate(self.df_paragraphs), [])
+        cube = store.get_cube()
+
+        self.assertEqual(cube.count(), 5)
+        self.assertEqual(cube.count(party="CDU"), 3)
+        self.assertEqual(cube.sentiment_counts(party="CDU"), (1, 2, 0))
+        self.assertEqual(cube.sentiment_counts(party="SPD", media="TAZ"), (0, 0, 1))
+
+    def test_get_cube_date_filter(self):
+        store = AggregateStore(AggregateStore.aggregate(self.df_paragraphs), [])
+
+        self.assertEqual(store.get_cube(min_date="2019-10-01").count(), 4)
+        self.assertEqual(store.get_cube(min_date="2020-08-01", max_date="2020-10-01").count(), 2)
+        self.assertEqual(store.get_cube(min_date="2020-09-01").count(party="CDU"), 1)
+
+    def test_get_date_range(self):
+        store = AggregateStore(AggregateStore.aggregate(self.df_paragraphs), [])
+
+        self.assertEqual(store.get_date_range(), ("2020-09-01", "2020-10-01"))
+        self.assertEqual(store.get_date_range(min_date="2020-09-01"), ("2020-10-01", "2020-10-01"))
+        self.assertEqual(store.get_date_range(min_date="2020-10-01"), (None, None))
+
+    def test_update_incrementally(self):
+        AggregateStore.update(self.df_paragraphs.iloc[:2], filename="aggregate_store_test")
+        store = AggregateStore.update(self.df_paragraphs, filename="aggregate_store_test")
+        self.assertEqual(sorted(store.article_hashes), ["a", "b", "c"])
+
+        # The stored aggregates are the aggregates of all paragraphs
+        stored = AggregateStore.read("aggregate_store_test")
+        expected = AggregateStore.aggregate(self.df_paragraphs)
+
+        self.assertEqual(stored.aggregates.columns.tolist(), expected.columns.tolist())
+        self.assertEqual(stored.aggregates["count"].tolist(), expected["count"].tolist())
+
+    def test_update_rebuilds_removed_articles(self):
+        AggregateStore.update(self.df_paragraphs, filename="aggregate_store_test")
+        store = AggregateStore.update(self.df_paragraphs.iloc[2:], filename="aggregate_store_test")
+
+        self.assertEqual(sorted(store.article_hashes), ["b", "c"])
+        self.assertEqual(store.get_cube().count(), 3)
+
+    def test_update_rebuilds_changed_sentiment(self):
+        AggregateStore.update(self.df_paragraphs.iloc[:3], filename="aggregate_store_test")
+
+        # A new article arrives and the sentiment of an aggregated paragraph is recalculated
+        df_paragraphs = self.df_paragraphs.copy()
+        df_paragraphs.loc[0, "sentiment"] = "Negative"
+        df_paragraphs.loc[0, "sentiment_score"] = -0.5
+        store = AggregateStore.update(df_paragraphs, filename="aggregate_store_test")
+
+        self.assertEqual(
+            store.get_cube().sentiment_counts(party="CDU"),
+            AggregationCube.from_dataframe(df_paragraphs).sentiment_counts(party="CDU"),
+        )
+        self.assertEqual(AggregateStore.read("aggregate_store_test").fingerprints, store.fingerprints)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import unittest
+
+import numpy as np
+from pandas import DataFrame
+
+from src.utils.aggregation_cube import AggregationCube
+from src.utils.statistics import Statistics
+
+
+class AggregationCubeTest(unittest.TestCase):
+    def setUp(self):
+        self.df_paragraphs = DataFrame(
+            {
+                "parties": [["CDU"], ["CDU", "SPD"], ["SPD"], [], ["Grüne", "CDU"]],
+                "media": ["Bild", "TAZ", "Bild", "Tagesschau", "Bild"],
+                "sentiment": ["Positive", "Negative", "Neutral", "Positive", "Negative"],
+                "date": ["2020-09-01", "2020-09-15", np.nan, "2020-10-01", "2020-10-02"],
+            }
+        )
+        self.cube = AggregationCube.from_dataframe(self.df_paragraphs)
+
+    def test_count(self):
+        self.assertEqual(self.cube.count(), 5)
+        self.assertEqual(self.cube.count(party="CDU"), 3)
+        self.assertEqual(self.cube.count(party="CDU", media="Bild"), 2)
+        self.assertEqual(self.cube.count(party="AfD"), 0)
+        self.assertEqual(self.cube.count(media="ZEIT"), 0)
+
+    def test_count_months(self):
+        self.assertEqual(self.cube.months, ["2020-09", "2020-10"])
+        self.assertEqual(self.cube.count(months=["2020-10"]), 2)
+        self.assertEqual(self.cube.count(party="CDU", months=["2020-09", "2020-10"]), 3)
+
+    def test_sentiment_counts(self):
+        self.assertEqual(self.cube.sentiment_counts(), (2, 2, 1))
+        self.assertEqual(self.cube.sentiment_counts(party="SPD"), (0, 1, 1))
+
+    def test_statistics(self):
+        x, y = Statistics.get_basic_statistics(self.df_paragraphs, ["Bild", "TAZ"], ["CDU", "SPD"], self.cube)
+        self.assertEqual(x, ["Total", "Bild", "TAZ", "CDU", "SPD"])
+        self.assertEqual(y, [5, 3, 1, 3, 2])
+
+        x, y = Statistics.get_media_statistics(self.df_paragraphs, "Bild", ["CDU", "SPD"], self.cube)
+        self.assertEqual(y, [3, 2, 1])
+
+        x, y = Statistics.get_party_statistics(self.df_paragraphs, "CDU", ["Bild", "TAZ"], self.cube)
+        self.assertEqual(y, [3, 2, 1])
+
+        statistics = Statistics.get_sentiment_statistics(self.df_paragraphs, True, ["CDU"], ["Bild", "TAZ"])
+        self.assertEqual(statistics, {"CDU": {"Bild": (1, 1, 0), "TAZ": (0, 1, 0)}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import contextlib
+import io
+import unittest
+
+from src.utils.arguments import parse_arguments
+
+
+class ArgumentsTest(unittest.TestCase):
+    def assertInvalid(self, args):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_arguments(args)
+
+    def test_windows(self):
+        self.assertEqual(parse_arguments([]).windows, (0, 35))
+        self.assertEqual(parse_arguments(["--windows", "3-8"]).windows, (3, 8))
+        self.assertEqual(parse_arguments(["--windows", "5"]).windows, (5, 5))
+
+        self.assertInvalid(["--windows", "5-3"])
+        self.assertInvalid(["--windows", "a-3"])
+        self.assertInvalid(["--windows", "1-2-3"])
+        self.assertInvalid(["--window-step", "0"])
+
+    def test_score_thresholds(self):
+        args = parse_arguments(["--max-score-threshold", "0.002", "--score-step", "1e-6"])
+        self.assertEqual((args.max_score_threshold, args.score_step), (0.002, 1e-6))
+
+        self.assertInvalid(["--score-step", "0"])
+        self.assertInvalid(["--score-step", "nan"])
+        self.assertInvalid(["--max-score-threshold", "-0.001"])
+
+    def test_processes(self):
+        self.assertEqual(parse_arguments(["-p", "-1"]).processes, -1)
+        self.assertEqual(parse_arguments(["-p", "4"]).processes, 4)
+
+        self.assertInvalid(["-p", "0"])
+        self.assertInvalid(["-p", "-2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
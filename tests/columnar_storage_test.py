@@ -0,0 +1,142 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import shutil
+import unittest
+
+import numpy as np
+import pandas as pd
+from pandas import Categorical, DataFrame
+
+from utils.reader import Reader
+from utils.token_ids import TokenIds
+from utils.writer import Writer
+
+
+class ColumnarStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.dataframe = DataFrame(
+            {
+                "article_index": [0, 0, 1],
+                "text": [["für", "die", "cdu"], [], ["die", "spd"]],
+                "media": ["Bild", "TAZ", "Tagesschau"],
+                "date": ["2020-09-01", None, "2020-10-01"],
+                "polarity": [[None, 0.5, None], [], [-0.5, None]],
+                "party_indices": [[2], [], [1]],
+                "sentiment_score": [0.5, 0.0, -0.25],
+                "sentiment": Categorical(
+                    ["Positive", "Neutral", "Negative"], categories=["Positive", "Negative", "Neutral"]
+                ),
+            }
+        )
+
+        Writer.write_columns(self.dataframe, "columnar_storage_test")
+
+    def tearDown(self):
+        shutil.rmtree("src/output/columnar_storage_test")
+
+    def test_read_columns(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test")
+
+        self.assertEqual(dataframe.columns.tolist(), self.dataframe.columns.tolist())
+
+        for column in self.dataframe.columns:
+            self.assertEqual(dataframe[column].tolist(), self.dataframe[column].tolist())
+
+    def test_read_columns_projection(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", columns=["media", "polarity"])
+
+        self.assertEqual(dataframe.columns.tolist(), ["media", "polarity"])
+        self.assertEqual(dataframe["polarity"].tolist(), [[None, 0.5, None], [], [-0.5, None]])
+
+    def test_list_columns_stored_as_values_and_offsets(self):
+        values = np.load("src/output/columnar_storage_test/1.values.npy")
+        offsets = np.load("src/output/columnar_storage_test/1.offsets.npy")
+
+        self.assertEqual(values.dtype, np.int32)
+        self.assertEqual(offsets.tolist(), [0, 3, 3, 5])
+
+    def test_categorical_columns_stored_as_codes(self):
+        codes = np.load("src/output/columnar_storage_test/7.values.npy")
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", columns=["sentiment"])
+
+        self.assertEqual(codes.tolist(), [0, 2, 1])
+        self.assertEqual(dataframe["sentiment"].dtype, self.dataframe["sentiment"].dtype)
+
+    def test_read_row_ids(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", columns=["media"], row_ids=True)
+
+        self.assertEqual(dataframe.columns.tolist(), ["media", "row_id"])
+        self.assertEqual(dataframe["row_id"].tolist(), [0, 1, 2])
+
+    def test_load_columns(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", columns=["media"], row_ids=True)
+        filtered = dataframe[dataframe["media"] != "TAZ"]
+        loaded = Reader.load_columns(filtered, "src/output/columnar_storage_test", ["text", "sentiment_score"])
+
+        self.assertEqual(loaded.columns.tolist(), ["media", "row_id", "text", "sentiment_score"])
+        self.assertEqual(loaded.index.tolist(), [0, 2])
+        self.assertEqual(loaded["text"].tolist(), [["für", "die", "cdu"], ["die", "spd"]])
+        self.assertEqual(loaded["sentiment_score"].tolist(), [0.5, -0.25])
+        self.assertEqual(filtered.columns.tolist(), ["media", "row_id"])
+
+        # All stored columns keep their types
+        loaded = Reader.load_columns(filtered, "src/output/columnar_storage_test")
+        self.assertEqual(loaded["sentiment"].dtype, self.dataframe["sentiment"].dtype)
+        self.assertEqual(loaded["party_indices"].tolist(), [[2], [1]])
+
+    def test_load_columns_after_index_rebuilding(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", columns=["media"], row_ids=True)
+        df_media = DataFrame({"media": ["Tagesschau", "Bild"], "country": ["DE", "DE"]})
+
+        rebuilt = {
+            "sort_values": dataframe.sort_values("media", ascending=False, ignore_index=True),
+            "sample": dataframe.sample(frac=1, random_state=1, ignore_index=True),
+            "drop_duplicates": pd.concat([dataframe.iloc[[2]], dataframe]).drop_duplicates(ignore_index=True),
+            "reset_index": dataframe.iloc[[2, 0]].reset_index(drop=True),
+            "concat": pd.concat([dataframe.iloc[[2]], dataframe.iloc[[0, 1]]], ignore_index=True),
+            "merge": dataframe.merge(df_media, on="media"),
+        }
+
+        # The values are selected by the row ids, not by the rebuilt index
+        for operation, result in rebuilt.items():
+            loaded = Reader.load_columns(result, "src/output/columnar_storage_test", ["text", "sentiment_score"])
+            rows = result["row_id"].tolist()
+
+            self.assertEqual(loaded["media"].tolist(), self.dataframe["media"][rows].tolist(), operation)
+            self.assertEqual(loaded["text"].tolist(), self.dataframe["text"][rows].tolist(), operation)
+            self.assertEqual(
+                loaded["sentiment_score"].tolist(), self.dataframe["sentiment_score"][rows].tolist(), operation
+            )
+
+    def test_load_columns_without_row_ids(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", columns=["media"])
+
+        with self.assertRaises(ValueError):
+            Reader.load_columns(dataframe, "src/output/columnar_storage_test", ["text"])
+
+    def test_token_ids(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", columns=["media"], row_ids=True)
+        filtered = dataframe[dataframe["media"] != "TAZ"].iloc[::-1]
+
+        tokens = TokenIds.from_dataframe(filtered, "text", "src/output/columnar_storage_test")
+
+        self.assertEqual(tokens.vocabulary.decode(tokens.ids).tolist(), ["die", "spd", "für", "die", "cdu"])
+        self.assertEqual(tokens.offsets.tolist(), [0, 2, 5])
+        self.assertEqual(filtered.columns.tolist(), ["media", "row_id"])
+
+    def test_write_without_row_ids(self):
+        dataframe = Reader.read_columns("src/output/columnar_storage_test", row_ids=True)
+        Writer.write_columns(dataframe.iloc[[2, 0]], "columnar_storage_test")
+
+        dataframe = Reader.read_columns("src/output/columnar_storage_test")
+        self.assertEqual(dataframe.columns.tolist(), self.dataframe.columns.tolist())
+        self.assertEqual(dataframe["text"].tolist(), [["die", "spd"], ["für", "die", "cdu"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
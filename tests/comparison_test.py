@@ -0,0 +1,41 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import unittest
+
+import numpy as np
+from pandas import Series
+
+from src.utils.comparison import Comparison
+
+
+class ComparisonTest(unittest.TestCase):
+    def setUp(self):
+        self.scores = Series([0.004, 0.002, -0.003, -0.001, 0.0, 0.001])
+        self.labeled_sentiment = Series(["Positive", "Positive", "Negative", "Neutral", "Neutral", "Neutral"])
+
+    def test_sweep_thresholds(self):
+        thresholds, f1_scores = Comparison.sweep_thresholds(self.scores, self.labeled_sentiment, 0.005)
+
+        self.assertEqual([0, 0.001, 0.002, 0.003, 0.004], thresholds.tolist())
+
+        # All paragraphs except the neutral one with score 0 are mapped to positive or negative
+        np.testing.assert_allclose(f1_scores[0], [0.8, 2 / 3, 0.5])
+
+        # Only the labeled neutral paragraphs are below or at the threshold
+        np.testing.assert_allclose(f1_scores[1], [1, 1, 1])
+
+        # All paragraphs are mapped to neutral
+        np.testing.assert_allclose(f1_scores[4], [0, 0, 2 / 3])
+
+    def test_sweep_thresholds_max_threshold(self):
+        thresholds, _ = Comparison.sweep_thresholds(self.scores, self.labeled_sentiment, 0.0025)
+        self.assertEqual([0, 0.001, 0.002], thresholds.tolist())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import unittest
+
+from pandas import DataFrame
+
+from src.utils.group_index import GroupIndex
+
+
+class GroupIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.df_paragraphs = DataFrame(
+            {
+                "parties": [["CDU"], ["CDU", "SPD"], ["SPD"], [], ["Grüne", "CDU"]],
+                "media": ["Bild", "TAZ", "Bild", "Tagesschau", "Bild"],
+            }
+        )
+        self.group_index = GroupIndex.from_dataframe(self.df_paragraphs)
+
+    def test_party_mask(self):
+        self.assertEqual(self.group_index.party_mask("CDU").tolist(), [True, True, False, False, True])
+        self.assertEqual(self.group_index.party_mask("CDU", only=True).tolist(), [True, False, False, False, False])
+        self.assertEqual(self.group_index.party_mask("AfD").tolist(), [False] * 5)
+
+    def test_media_mask(self):
+        self.assertEqual(self.group_index.media_mask("Bild").tolist(), [True, False, True, False, True])
+        self.assertEqual(self.group_index.media_mask("ZEIT").tolist(), [False] * 5)
+
+    def test_select(self):
+        df_filtered = self.df_paragraphs.iloc[[4, 1]]
+        group_index = self.group_index.select(df_filtered)
+
+        self.assertEqual(group_index.party_mask("Grüne").tolist(), [True, False])
+        self.assertEqual(group_index.media_mask("TAZ").tolist(), [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,11 +5,15 @@ testdir = os.path.dirname(__file__)
 srcdir = "../src"
 sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 
+import shutil
 import unittest
 
 from pandas import DataFrame
 
 from src.keyword_extraction import KeywordExtraction
+from src.utils.vocabulary import Vocabulary
+from utils.reader import Reader
+from utils.writer import Writer
 
 
 class KeywordExtractionTest(unittest.TestCase):
@@ -72,6 +76,90 @@ class KeywordExtractionTest(unittest.TestCase):
         term_count = self.keyword_extraction.get_term_count(self.df_paragraphs, False, "Tagesschau", "gesundheit")
         self.assertEqual(term_count, 3)
 
+    def test_get_term_count_unknown_term(self):
+        term_count = self.keyword_extraction.get_term_count(self.df_paragraphs, True, "CDU", "wahlkampf")
+        self.assertEqual(term_count, 0)
+
+    def test_get_top_words_of_all_groups(self):
+        top_words = self.keyword_extraction._get_top_words(
+            ["CDU", "Linke"], ["Tagesschau", "Bild"], self.keyword_extraction._get_model(), topn=2
+        )
+
+        self.assertEqual(top_words[0][0], "gesundheit")
+        self.assertEqual(top_words[1][0], "polizei")
+        self.assertEqual(len(top_words[2]), 2)
+        self.assertEqual(sorted(top_words[3]), ["finanzen", "gesundheit"])
+
+    def test_blacklist_mask(self):
+        keyword_extraction = KeywordExtraction(self.df_paragraphs)
+        vocabulary = Vocabulary(["parteitag", "umwelt", "wochentag"])
+        mask = keyword_extraction._get_blacklist_mask(vocabulary)
+        self.assertEqual(mask.tolist(), [True, False, True])
+
+        # Only new terms of the same vocabulary are checked
+        vocabulary.add("uhrzeit")
+        self.assertEqual(keyword_extraction._get_blacklist_mask(vocabulary).tolist(), [True, False, True, True])
+
+    def test_model_cache(self):
+        keyword_extraction = KeywordExtraction(self.df_paragraphs, cache_size=1)
+        keyword_extraction.get_term_weight_tuples(by_party=True)
+        model = keyword_extraction._get_model()
+
+        # Filtering the same rows again reuses the fitted model
+        keyword_extraction.set_active_media(["Bild", "Tagesschau", "TAZ"])
+        self.assertIs(keyword_extraction._get_model(), model)
+        self.assertEqual(len(keyword_extraction.model_cache), 1)
+
+        # Other rows are fitted again and the least recently used model is removed
+        keyword_extraction.set_active_media(["Bild", "Tagesschau"])
+        self.assertIsNot(keyword_extraction._get_model(), model)
+        self.assertEqual(len(keyword_extraction.model_cache), 1)
+
+        keyword_extraction.set_data(self.df_paragraphs)
+        self.assertIsNot(keyword_extraction._get_model(), model)
+
+    def test_model_cache_of_changed_nouns(self):
+        df_paragraphs = self.df_paragraphs.assign(nouns=[list(nouns) for nouns in self.df_paragraphs["nouns"]])
+        keyword_extraction = KeywordExtraction(df_paragraphs)
+        model = keyword_extraction._get_model()
+        nouns = keyword_extraction.nouns
+
+        # Filtered rows are identified by the nouns that were hashed once
+        keyword_extraction.set_active_media(["Bild", "Tagesschau"])
+        keyword_extraction._get_model()
+        self.assertIs(keyword_extraction.nouns, nouns)
+
+        # Equal nouns in other lists are hashed again and reuse the fitted model
+        keyword_extraction.set_data(df_paragraphs.assign(nouns=[list(nouns) for nouns in df_paragraphs["nouns"]]))
+        self.assertIs(keyword_extraction._get_model(), model)
+        self.assertIsNot(keyword_extraction.nouns, nouns)
+
+        # Other nouns are fitted again
+        changed_nouns = [list(nouns) for nouns in df_paragraphs["nouns"]]
+        changed_nouns[0].append("gesundheit")
+        keyword_extraction.set_data(df_paragraphs.assign(nouns=changed_nouns))
+        changed_model = keyword_extraction._get_model()
+        self.assertIsNot(changed_model, model)
+        self.assertEqual(changed_model[3].sum(), model[3].sum() + 1)
+
+    def test_stored_nouns(self):
+        Writer.write_columns(self.df_paragraphs, "keyword_extraction_test")
+        path = "src/output/keyword_extraction_test"
+
+        try:
+            df_paragraphs = Reader.read_columns(path, ["parties", "media"], row_ids=True)
+            df_paragraphs = df_paragraphs.sample(frac=1, random_state=0, ignore_index=True)
+            keyword_extraction = KeywordExtraction(df_paragraphs, column_path=path)
+            tuples = keyword_extraction.get_term_weight_tuples(by_party=False, media=["TAZ", "Bild"], topn=1)
+        finally:
+            shutil.rmtree(path)
+
+        # The token ids of the stored nouns are selected by the row ids and give the same keywords as the loaded nouns
+        expected = self.keyword_extraction.get_term_weight_tuples(by_party=False, media=["TAZ", "Bild"], topn=1)
+
+        self.assertEqual(sorted(tuples.itertuples(index=False)), sorted(expected.itertuples(index=False)))
+        self.assertIsNone(keyword_extraction.nouns)
+
 
 if __name__ == "__main__":
     unittest.main()
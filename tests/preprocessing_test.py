@@ -5,14 +5,18 @@ testdir = os.path.dirname(__file__)
 srcdir = "../src"
 sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 
+import shutil
 import unittest
+from pathlib import Path
 
 import nltk
 import spacy
 from pandas import DataFrame, Series
 from spacy_sentiws import spaCySentiWS
 
+from model.document_type import DocumentType
 from src.preprocessing import Preprocessing
+from utils.reader import Reader
 
 
 class NERTaggerTest(unittest.TestCase):
@@ -50,14 +54,14 @@ class NERTaggerTest(unittest.TestCase):
     def test_tokenization(self):
         text = "Dieser Text soll in der Tokenization in Tokens unterteilt werden"
         series = Series([text])
-        tokens = self.preprocessing._tokenization(series)[0]
-        self.assertEqual(tokens[0].text, "Dieser")
+        lemmas = self.preprocessing._extract_features(series)["lemmas"][0]
+        self.assertEqual(lemmas[0], "dies")
+        self.assertEqual(len(lemmas), 10)
 
     def test_pos_tagging(self):
         text = "In diesem Test soll das POS Tagging getestet werden."
         series = Series([text])
-        tokens = self.preprocessing._tokenization(series)
-        pos_tagged = self.preprocessing._pos_tagging(tokens)[0]
+        pos_tagged = self.preprocessing._extract_features(series)["pos_tags"][0]
         self.assertEqual(pos_tagged, ["APPR", "PDAT", "NN", "VMFIN", "ART", "NN", "NE", "VVPP", "VAINF", "$."])
 
     def test_get_nouns(self):
@@ -66,8 +70,7 @@ class NERTaggerTest(unittest.TestCase):
             "Themen in Artikeln interessant sein."
         )
         series = Series([text])
-        tokens = self.preprocessing._tokenization(series)
-        nouns = self.preprocessing._get_nouns(tokens)[0]
+        nouns = self.preprocessing._extract_features(series)["nouns"][0]
         self.assertEqual(nouns, ["text", "substantiv", "wort", "thema", "artikel"])
 
     def test_lemmatize(self):
@@ -76,8 +79,7 @@ class NERTaggerTest(unittest.TestCase):
             "dass von Wörtern die Grundformen gefunden werden sollen."
         )
         series = Series([text])
-        tokens = self.preprocessing._tokenization(series)
-        lemmas = self.preprocessing._lemmatizing(tokens)[0]
+        lemmas = self.preprocessing._extract_features(series)["lemmas"][0]
         self.assertEqual(
             lemmas,
             [
@@ -105,12 +107,25 @@ class NERTaggerTest(unittest.TestCase):
             ],
         )  #
 
+    def test_extract_features(self):
+        series = Series(["Angela Merkel ist Mitglied der CDU.", "Heute ist ein schöner Tag"], index=[3, 5])
+        features = self.preprocessing._extract_features(series)
+
+        self.assertEqual(
+            features.columns.tolist(), ["persons", "organizations", "polarity", "pos_tags", "nouns", "lemmas"]
+        )
+        self.assertEqual(features.index.tolist(), [3, 5])
+
+        # Every token based feature has one entry per token
+        for column in ["polarity", "pos_tags", "lemmas"]:
+            self.assertEqual(features[column].apply(len).tolist(), [6, 5])
+
     def test_ner_tagging(self):
         text_to_tag = "Angela Merkel ist die deutsche Bundeskanzlerin und sie ist Mitglied der CDU."
-        series = Series([self.nlp(text_to_tag)])
+        features = self.preprocessing._extract_features(Series([text_to_tag]))
 
-        persons = self.preprocessing._tag_persons(series).tolist()[0]
-        organizations = self.preprocessing._tag_organizations(series).tolist()[0]
+        persons = features["persons"][0]
+        organizations = features["organizations"][0]
 
         self.assertEqual(persons, ["Angela Merkel"], "The person list should contain Angela Merkel")
         self.assertEqual(organizations, ["CDU"], "The organization list should contain CDU")
@@ -119,10 +134,10 @@ class NERTaggerTest(unittest.TestCase):
         text_to_tag = (
             "Die FDP ist eine Partei. Der Vorsitzende der FDP ist Christian Lindner. Die SPD ist eine andere Partei!"
         )
-        series = Series([self.nlp(text_to_tag)])
+        features = self.preprocessing._extract_features(Series([text_to_tag]))
 
-        persons = self.preprocessing._tag_persons(series).tolist()[0]
-        organizations = sorted(self.preprocessing._tag_organizations(series).tolist()[0])
+        persons = features["persons"][0]
+        organizations = sorted(features["organizations"][0])
 
         self.assertEqual(persons, ["Christian Lindner"], "The person list should contain Christian Lindner")
         self.assertEqual(organizations, ["FDP", "SPD"], "FDP should be filtered out of the organization list")
@@ -132,28 +147,29 @@ class NERTaggerTest(unittest.TestCase):
             "Es gibt viele Parteien wie die CDU, die Grünen, die Liberalen, die Sozialdemokraten," " die AfD und andere"
         )
         series = Series([text])
-        tokens = self.preprocessing._tokenization(series)
-        organizations = self.preprocessing._tag_organizations(tokens)
+        organizations = self.preprocessing._extract_features(series)["organizations"]
         parties = self.preprocessing._get_parties(organizations)[0]
         self.assertEqual(parties, ["CDU", "SPD", "Grüne", "FDP", "AfD"])
 
+    def test_get_party_candidates(self):
+        series = Series(["Die Grünen und die Union", "Ein Text ohne Partei", "Die AfD im Bundestag"])
+        party_candidates = self.preprocessing._get_party_candidates(series)
+        self.assertEqual(party_candidates.tolist(), [True, False, True])
+
     def test_remove_rows_without_parties(self):
         with_party = "In dieser Reihe kommt die CDU vor, sie sollte nicht gefiltert werden"
         without_party = "In dieser Reihe kommt keine Partei vor, sie sollte gefiltert werden"
         d = {"text": [with_party, without_party]}
         dataframe = DataFrame(data=d)
-        dataframe["text"] = self.preprocessing._tokenization(dataframe["text"])
-        dataframe["organizations"] = self.preprocessing._tag_organizations(dataframe["text"])
+        dataframe["organizations"] = self.preprocessing._extract_features(dataframe["text"])["organizations"]
         dataframe["parties"] = self.preprocessing._get_parties(dataframe["organizations"])
         dataframe = self.preprocessing._remove_rows_without_parties(dataframe)
         self.assertEqual(dataframe.shape[0], 1)
-        party_row_string = " ".join([token.text for token in dataframe["text"][0]])
-        self.assertEqual(party_row_string, "In dieser Reihe kommt die CDU vor , sie sollte nicht gefiltert werden")
+        self.assertEqual(dataframe["text"][0], with_party)
 
     def test_determine_polarity_sentiws(self):
         series = Series(["Heute ist ein schöner Tag", "Heute ist ein schlechter Tag"])
-        tokens = self.preprocessing._tokenization(series)
-        polarity = self.preprocessing._determine_polarity_sentiws(tokens)
+        polarity = self.preprocessing._extract_features(series)["polarity"]
 
         self.assertGreater(polarity[0][3], 0)
         self.assertLess(polarity[1][3], 0)
@@ -167,14 +183,110 @@ class NERTaggerTest(unittest.TestCase):
         self.assertLess(polarity[1], 0)
 
     def test_negation_handling(self):
-        dataframe = DataFrame(data={"text": ["Heute ist kein schöner Tag"]})
-        dataframe["text"] = self.preprocessing._tokenization(dataframe["text"])
-        dataframe["polarity"] = self.preprocessing._determine_polarity_sentiws(dataframe["text"])
+        features = self.preprocessing._extract_features(Series(["Heute ist kein schöner Tag"]))
+        dataframe = DataFrame(data={"text": features["lemmas"], "polarity": features["polarity"]})
         dataframe = self.preprocessing._negation_handling(dataframe)
         polarity = dataframe["polarity"][0]
         self.assertLess(polarity[3], 0)
         self.assertIsNone(polarity[0])
 
+    def test_negation_handling_whole_tokens(self):
+        dataframe = DataFrame(
+            data={
+                "text": [
+                    ["die", "familie", "sein", "gut"],
+                    ["das", "sein", "nicht", "gut"],
+                    ["gut", "a", "b", "c", "d", "nie"],
+                ],
+                "polarity": [[None, None, None, 0.5], [None, None, None, 0.5], [0.5, None, None, None, None, None]],
+            }
+        )
+        dataframe = self.preprocessing._negation_handling(dataframe)
+        polarity = dataframe["polarity"]
+        self.assertEqual([None, None, None, 0.5], polarity[0])
+        self.assertEqual([None, None, None, -0.5], polarity[1])
+        self.assertEqual(0.5, polarity[2][0])
+
+
+class SplitPreprocessing(Preprocessing):
+    """
+    Preprocessing that only splits the paragraphs, so the cache can be tested without the spacy pipeline.
+    """
+
+    def _apply_preprocessing(self, dataframe, document_type, filter_type):
+        self.processed_articles += dataframe["article_hash"].nunique()
+        return dataframe
+
+
+class PreprocessingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.preprocessing = SplitPreprocessing()
+        self.preprocessing.processed_articles = 0
+        self.df_articles = DataFrame(
+            {
+                "title": ["A", "B", "C", "D"],
+                "text": ["a1\na2", "b1", "c1\nc2", "d1"],
+                "media": ["Bild", "TAZ", "Tagesschau", "Bild"],
+                "date": ["2020-09-01", "2020-09-02", "2020-09-03", "2020-09-04"],
+            }
+        )
+
+    def tearDown(self):
+        if Path("src/output/preprocessing_cache_test").exists():
+            shutil.rmtree("src/output/preprocessing_cache_test")
+            Path("src/output/preprocessing_cache_test_hashes.json").unlink()
+
+    def _get_paragraphs(self, rows, columns=None):
+        return self.preprocessing._get_preprocessed_df(
+            "preprocessing_cache_test", self.df_articles.iloc[rows], DocumentType.PARAGRAPH, False, columns
+        )
+
+    def test_cache_returns_current_articles(self):
+        self._get_paragraphs([0, 1])
+        df_paragraphs = self._get_paragraphs([2, 1])
+
+        # Only the new article is preprocessed, but only the paragraphs of the current articles are returned
+        self.assertEqual(self.preprocessing.processed_articles, 3)
+        self.assertEqual(sorted(df_paragraphs["text"]), ["b1", "c1", "c2"])
+        self.assertEqual(df_paragraphs["article_index"].dtype, "int64")
+        self.assertEqual(dict(zip(df_paragraphs["text"], df_paragraphs["article_index"])), {"b1": 1, "c1": 0, "c2": 0})
+
+        # Without new articles the cached paragraphs of the current articles are returned
+        df_paragraphs = self._get_paragraphs([0])
+        self.assertEqual(self.preprocessing.processed_articles, 3)
+        self.assertEqual(df_paragraphs["text"].tolist(), ["a1", "a2"])
+        self.assertEqual(df_paragraphs["article_index"].tolist(), [0, 0])
+
+    def test_cache_keeps_articles_of_other_subsets(self):
+        self._get_paragraphs([0, 1])
+        self._get_paragraphs([2, 3])
+        df_paragraphs = self._get_paragraphs([0, 2])
+
+        # The paragraphs of earlier subsets are neither lost nor preprocessed again
+        self.assertEqual(self.preprocessing.processed_articles, 4)
+        self.assertEqual(sorted(df_paragraphs["text"]), ["a1", "a2", "c1", "c2"])
+        self.assertEqual(
+            dict(zip(df_paragraphs["text"], df_paragraphs["article_index"])), {"a1": 0, "a2": 0, "c1": 1, "c2": 1}
+        )
+
+        # The cache contains the paragraphs of all processed articles
+        df_cached = Reader.read_columns("src/output/preprocessing_cache_test")
+        self.assertEqual(sorted(df_cached["text"]), ["a1", "a2", "b1", "c1", "c2", "d1"])
+
+    def test_cache_columns_loaded_by_row_ids(self):
+        path = Preprocessing.get_columns_path("preprocessing_cache_test")
+
+        # Rows of new articles and rows read from the cache can both be completed from the stored columns
+        for rows in [[0, 2], [2, 1], [2]]:
+            df_paragraphs = self._get_paragraphs(rows, columns=["media"])
+            self.assertEqual(
+                sorted(df_paragraphs.columns), ["article_hash", "article_index", "media", "row_id"], str(rows)
+            )
+
+            df_paragraphs = Reader.load_columns(df_paragraphs, path, ["text"])
+            texts = [text for row in rows for text in self.df_articles["text"][row].split("\n")]
+            self.assertEqual(sorted(df_paragraphs["text"]), sorted(texts), str(rows))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,44 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import json
+import unittest
+
+from src.utils.reader import Reader
+
+
+class ReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.path = "src/output/reader_test.json"
+        self.articles = [{"title": "Titel {}".format(index), "text": "Text ] {}".format(index)} for index in range(20)]
+
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump({"articles": self.articles}, file, ensure_ascii=False)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_stream_articles(self):
+        articles = list(Reader.stream_articles(self.path, chunk_size=8))
+        self.assertEqual(self.articles, articles)
+
+    def test_reservoir_sample(self):
+        sample, count = Reader._reservoir_sample(iter(self.articles), 5)
+        self.assertEqual(20, count)
+        self.assertEqual(5, len(sample))
+        self.assertEqual(5, len({article["title"] for article in sample}))
+
+        sample, count = Reader._reservoir_sample(iter(self.articles), 50)
+        self.assertEqual(self.articles, sample)
+
+    def test_allocate_samples(self):
+        self.assertEqual([2, 7, 1], Reader._allocate_samples([100, 300, 50], 10))
+        self.assertEqual([1, 1, 1], Reader._allocate_samples([1, 1, 1], 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import unittest
+
+import numpy as np
+from sklearn import metrics
+
+from src.utils.sentiment_metrics import SENTIMENT_LABELS, SentimentMetrics
+
+
+class SentimentMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.labeled_sentiment = ["Positive", "Positive", "Negative", "Neutral", "Neutral", "Neutral", "Negative"]
+        self.mapped_sentiment = ["Positive", "Neutral", "Negative", "Neutral", "Positive", "Neutral", "Positive"]
+        self.metrics = SentimentMetrics.from_sentiment(self.labeled_sentiment, self.mapped_sentiment)
+
+    def test_confusion(self):
+        np.testing.assert_array_equal(self.metrics.confusion, [[1, 0, 1], [1, 1, 0], [1, 0, 2]])
+
+    def test_metrics(self):
+        arguments = (self.labeled_sentiment, self.mapped_sentiment)
+
+        np.testing.assert_allclose(
+            self.metrics.precision(), metrics.precision_score(*arguments, labels=SENTIMENT_LABELS, average=None)
+        )
+        np.testing.assert_allclose(
+            self.metrics.recall(), metrics.recall_score(*arguments, labels=SENTIMENT_LABELS, average=None)
+        )
+        np.testing.assert_allclose(
+            self.metrics.f1_score(), metrics.f1_score(*arguments, labels=SENTIMENT_LABELS, average=None)
+        )
+        self.assertAlmostEqual(float(self.metrics.accuracy()), metrics.accuracy_score(*arguments))
+
+    def test_zero_division(self):
+        sentiment_metrics = SentimentMetrics.from_sentiment(["Positive", "Positive"], ["Positive", "Neutral"])
+        np.testing.assert_allclose(sentiment_metrics.precision(), [1, 0, 0])
+        np.testing.assert_allclose(sentiment_metrics.f1_score(), [2 / 3, 0, 0])
+
+    def test_stacked_confusion(self):
+        confusion = np.stack([self.metrics.confusion, np.eye(3, dtype=np.int64)])
+        f1_scores = SentimentMetrics(confusion).f1_score()
+        np.testing.assert_allclose(f1_scores[0], self.metrics.f1_score())
+        np.testing.assert_allclose(f1_scores[1], [1, 1, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
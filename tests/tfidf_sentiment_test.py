@@ -7,9 +7,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 
 import unittest
 
-from pandas import DataFrame, Series, testing
+import numpy as np
+from pandas import CategoricalDtype, DataFrame, Series, testing
 
 from src.tfidf_sentiment import TfidfSentiment
+from src.utils.sentiment_metrics import SENTIMENT_LABELS
 
 
 class TfidfSentimentTest(unittest.TestCase):
@@ -75,26 +77,23 @@ class TfidfSentimentTest(unittest.TestCase):
         output_sentiment_series = self.tfidf_sentiment.df_paragraphs["sentiment_score"]
         testing.assert_series_equal(output_sentiment_series, sentiment_series, check_names=False)
 
-    def test_map_context_polarity(self):
-        row = {"party_indices": [1, 5], "polarity": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]}
+    def test_get_context_scores(self):
+        context_scores = self.tfidf_sentiment.get_context_scores(5)
 
-        polarity_1 = self.tfidf_sentiment._map_context_polarity(row, 1, 3)
-        polarity_2 = self.tfidf_sentiment._map_context_polarity(row, 9, 3)
-        polarity_3 = self.tfidf_sentiment._map_context_polarity(row, 1, 5)
-        polarity_4 = self.tfidf_sentiment._map_context_polarity(row, 9, 5)
-
-        self.assertEqual(polarity_1, 2)
-        self.assertEqual(polarity_2, 0)
-        self.assertEqual(polarity_3, 2)
-        self.assertEqual(polarity_4, 10)
+        for window in [0, 3, 5]:
+            self.tfidf_sentiment.get_context_polarity(window)
+            self.tfidf_sentiment.calculate_sentiment_score(overwrite=True)
+            sentiment_score_context = self.tfidf_sentiment.df_paragraphs["sentiment_score_context"]
+            testing.assert_series_equal(sentiment_score_context, Series(context_scores[:, window]), check_names=False)
 
     def test_map_sentiment(self):
         self.tfidf_sentiment.get_context_polarity(3)
         self.tfidf_sentiment.calculate_sentiment_score()
         self.tfidf_sentiment.map_sentiment()
 
-        sentiment_series = Series(["Positive", "Negative", "Negative", "Positive", "Neutral"])
-        sentiment_context = Series(["Neutral", "Negative", "Neutral", "Neutral", "Neutral"])
+        dtype = CategoricalDtype(SENTIMENT_LABELS)
+        sentiment_series = Series(["Positive", "Negative", "Negative", "Positive", "Neutral"], dtype=dtype)
+        sentiment_context = Series(["Neutral", "Negative", "Neutral", "Neutral", "Neutral"], dtype=dtype)
 
         sentiment_series_sentiws = self.tfidf_sentiment.df_paragraphs["sentiment"]
         sentiment_series_textblob = self.tfidf_sentiment.df_paragraphs["sentiment_textblob"]
@@ -104,14 +103,20 @@ class TfidfSentimentTest(unittest.TestCase):
         testing.assert_series_equal(sentiment_series_textblob, sentiment_series, check_names=False)
         testing.assert_series_equal(sentiment_series_context, sentiment_context, check_names=False)
 
-    def test_map_sentiment_row(self):
-        sentiment_positive = self.tfidf_sentiment._map_sentiment("0.1")
-        sentiment_negative = self.tfidf_sentiment._map_sentiment("-0.1")
-        sentiment_neutral = self.tfidf_sentiment._map_sentiment("0")
+    def test_map_sentiment_stored_text(self):
+        self.tfidf_sentiment.df_paragraphs["sentiment_score"] = [0.1, -0.1, 0, 0, 0]
+        self.tfidf_sentiment.df_paragraphs["sentiment"] = ["Neutral", "Neutral", "Positive", "Negative", "Neutral"]
+        self.tfidf_sentiment.map_sentiment()
+
+        sentiment = self.tfidf_sentiment.df_paragraphs["sentiment"]
+        self.assertEqual(CategoricalDtype(SENTIMENT_LABELS), sentiment.dtype)
+        self.assertEqual(["Neutral", "Neutral", "Positive", "Negative", "Neutral"], sentiment.tolist())
+
+    def test_map_scores(self):
+        sentiment = self.tfidf_sentiment._map_scores(np.array([0.1, -0.1, 0, 9e-05, -9e-05]))
 
-        self.assertEqual(sentiment_positive, "Positive")
-        self.assertEqual(sentiment_negative, "Negative")
-        self.assertEqual(sentiment_neutral, "Neutral")
+        self.assertEqual(CategoricalDtype(SENTIMENT_LABELS), sentiment.dtype)
+        self.assertEqual(["Positive", "Negative", "Neutral", "Neutral", "Neutral"], sentiment.tolist())
 
     def test_remove_umlauts(self):
         text_with_umlauts = (
@@ -8,60 +8,74 @@ sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
 
 import unittest
 
+import numpy as np
 from pandas import DataFrame
 
-from src.time_course import TimeCourse, get_term_count_nouns, get_term_count_overall
+from src.time_course import TimeCourse
 
 
 class TimeCourseTest(unittest.TestCase):
-    def test_get_term_count_nouns(self):
+    def test_get_month_weights(self):
         df_paragraph = DataFrame(
             {
-                "media": ["Tagesschau", "Tagesschau"],
-                "party": ["CDU", "CDU"],
-                "nouns": [["gesundheit", "gesundheit", "gesundheit", "finanzen"], ["schule"]],
-                "date": ["2020-09-01", "2020-09-01"],
+                "nouns": [["gesundheit", "gesundheit", "finanzen"], ["schule"], ["gesundheit"], ["gesundheit"]],
+                "date": ["2020-08-15", "2020-08-20", "2020-09-01", None],
             }
         )
+        months = TimeCourse.get_months(datetime.datetime(2020, 8, 1), datetime.datetime(2020, 10, 15))
+        group_masks = np.array([[True, True, True, True], [False, True, False, False]])
 
-        weight = get_term_count_nouns(df_paragraph, "gesundheit")
-        self.assertEqual(weight, 1.5)
+        weights = TimeCourse.get_month_weights(df_paragraph, "nouns", group_masks, ["gesundheit", "wahl"], months)
 
-    def test_get_term_count_overall(self):
+        # The paragraph dated on the bound of two months and the paragraph without a date are in no month
+        self.assertEqual(len(months), 3)
+        self.assertEqual(weights.shape, (2, 2, 2))
+        self.assertEqual(weights[0].tolist(), [[1.0, 0.0], [0.0, 0.0]])
+        self.assertEqual(weights[1].tolist(), [[0.0, 0.0], [0.0, 0.0]])
+
+    def test_get_time_course_custom_word(self):
         df_paragraph = DataFrame(
             {
-                "media": ["Tagesschau", "Tagesschau"],
-                "party": ["CDU", "CDU"],
-                "text": [["gesundheit", "gesundheit", "gesundheit", "finanzen"], ["schule"]],
-                "date": ["2020-09-01", "2020-09-01"],
+                "media": ["Tagesschau", "TAZ", "Tagesschau"],
+                "parties": [["CDU"], ["CDU", "SPD"], ["SPD"]],
+                "text": [["die", "wahl", "wahl"], ["keine", "wahl"], ["wahl"]],
+                "date": ["2020-08-15", "2020-08-20", "2020-09-10"],
             }
         )
 
-        weight = get_term_count_overall(df_paragraph, "gesundheit")
-        self.assertEqual(weight, 1.5)
+        df_image = TimeCourse().get_time_course_custom_word(
+            ["CDU", "SPD", "FDP"],
+            "wahl",
+            "party",
+            datetime.datetime(2020, 8, 1),
+            datetime.datetime(2020, 10, 15),
+            df_paragraph,
+        )
+
+        self.assertEqual(df_image["filter_criteria"].tolist(), ["CDU", "SPD", "FDP"])
+        self.assertEqual(df_image["weight"].tolist(), [[1.5, 0.0], [1.0, 1.0], [0.0, 0.0]])
 
-    def test_configure_dataframe_for_time_course(self):
-        start_date = datetime.datetime(2020, 8, 1, 0, 0)
-        end_date = datetime.datetime(2020, 10, 1, 0, 0)
+    def test_get_time_course(self):
         df_paragraph = DataFrame(
             {
-                "media": "Tagesschau",
-                "party": "CDU",
-                "nouns": ["gesundheit", "gesundheit"],
-                "date": ["2020-09-01", "2020-11-01"],
+                "media": ["Tagesschau", "Tagesschau", "TAZ", "Tagesschau"],
+                "parties": [["CDU"], ["CDU"], ["SPD"], ["CDU"]],
+                "nouns": [["gesundheit", "gesundheit"], ["schule"], ["gesundheit"], ["gesundheit"]],
+                "date": ["2020-08-15", "2020-08-20", "2020-08-15", "2020-09-10"],
             }
         )
-        df_paragraph_test = DataFrame(
-            {
-                "media": "Tagesschau",
-                "party": "CDU",
-                "nouns": ["gesundheit", "gesundheit"],
-                "date": ["2020-09-01", "2020-09-01"],
-            }
+        df_top_terms = DataFrame({"party": ["CDU", "CDU"], "term": ["gesundheit", "wahl"]})
+
+        df_image = TimeCourse().get_time_course(
+            ["CDU"],
+            ["Tagesschau", "TAZ"],
+            df_top_terms,
+            datetime.datetime(2020, 8, 1),
+            datetime.datetime(2020, 10, 15),
+            df_paragraph,
         )
-        time_course = TimeCourse()
-        time_course.set_paragraph(df_paragraph)
 
-        df_interval = time_course.configure_dataframe_for_time_course(start_date, end_date, "Tagesschau", df_paragraph)
-        self.assertNotEqual(sorted(df_paragraph_test["nouns"].tolist()), sorted(df_interval["nouns"].tolist()))
-        self.assertNotEqual(sorted(df_paragraph_test["media"].tolist()), sorted(df_interval["media"].tolist()))
+        self.assertEqual(df_image["media"].tolist(), ["Tagesschau", "Tagesschau", "TAZ", "TAZ"])
+        self.assertEqual(df_image["term"].tolist(), ["gesundheit", "wahl", "gesundheit", "wahl"])
+        self.assertEqual(df_image["weight"].tolist(), [[1.0, 1.0], [0.0, 0.0], [1.0, 0.0], [0.0, 0.0]])
+        self.assertEqual(df_image["dates"][0], [datetime.datetime(2020, 8, 1), datetime.datetime(2020, 9, 1)])
@@ -0,0 +1,36 @@
+import os
+import sys
+
+testdir = os.path.dirname(__file__)
+srcdir = "../src"
+sys.path.insert(0, os.path.abspath(os.path.join(testdir, srcdir)))
+
+import unittest
+
+from pandas import Series
+
+from src.utils.vocabulary import Vocabulary
+
+
+class VocabularyTest(unittest.TestCase):
+    def setUp(self):
+        self.vocabulary = Vocabulary()
+        self.ids, self.offsets = self.vocabulary.encode_lists(Series([["Grüne", "für", "grüne"], [], ["für", "Größe"]]))
+
+    def test_encode_lists(self):
+        self.assertEqual(self.ids.tolist(), [0, 1, 2, 1, 3])
+        self.assertEqual(self.offsets.tolist(), [0, 3, 3, 5])
+        self.assertEqual(self.vocabulary.decode(self.ids).tolist(), ["Grüne", "für", "grüne", "für", "Größe"])
+
+    def test_map_terms(self):
+        lengths = self.vocabulary.map_terms(len, int)
+        self.assertEqual(lengths[self.ids].tolist(), [5, 3, 5, 3, 5])
+
+    def test_map_vocabulary(self):
+        vocabulary, ids = self.vocabulary.map_vocabulary(str.lower)
+        self.assertEqual(vocabulary.terms, ["grüne", "für", "größe"])
+        self.assertEqual(ids[self.ids].tolist(), [0, 1, 0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()